@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app import metrics
+from services.signals import read_signal_version
+
+try:
+    import brotli  # Optional: br is preferred when the client accepts it
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def render_json(content: Any) -> bytes:
+    """Serialize like FastAPI's JSONResponse (compact, UTF-8, no NaN)."""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedBody:
+    """
+    Serialized response body plus its strong ETag and lazily built compressed variants.
+    """
+
+    __slots__ = ("body", "etag", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded: Dict[str, bytes] = {"identity": body}
+
+    @classmethod
+    def from_gzip(cls, data: bytes) -> "CachedBody":
+        """Wrap a pre-compressed snapshot file; the gzip bytes are served as-is."""
+        entry = cls(gzip.decompress(data))
+        entry._encoded["gzip"] = data
+        return entry
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self._encoded[encoding] = data
+        return data
+
+    def etag_for(self, encoding: str) -> str:
+        # Distinct strong validators per representation (RFC 9110 8.8.3)
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, size: int) -> str:
+    if size < MIN_COMPRESS_SIZE or not accept_encoding:
+        return "identity"
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return "identity"
+
+
+def _etag_matches(if_none_match: str, entry: CachedBody) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        base = tag.strip('"').split("-", 1)[0]
+        if base == entry.etag:
+            return True
+    return False
+
+
+def conditional_response(request: Request, entry: CachedBody) -> Response:
+    """
+    Serve a cached body: 304 on If-None-Match hit, otherwise br/gzip/identity bytes.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(entry.body))
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Vary": "Accept-Encoding",
+        # Clients keep the body but must revalidate (cheap 304) on every poll
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.encoded(encoding), media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    In-process cache of pre-serialized response bodies.
+    Keys are (endpoint, mode, latest_date); every entry is dropped as soon as the
+    latest analysis date changes.
+
+    The latest date is refreshed by
+    - a latest-date probe, at most once per `probe_interval` seconds
+    - an explicit signal from the batch (stamp file written by services.signals),
+      which also drops every entry
+    """
+
+    def __init__(self, probe_interval: float = 60.0, max_entries: int = 512):
+        self.probe_interval = probe_interval
+        self.max_entries = max_entries
+        # LRU: paginated / projected variants must not grow the cache without bound
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._latest_date: Optional[str] = None
+        self._probed_at: float = 0.0
+        self._signal_version = read_signal_version()
+        self._lock = threading.Lock()
+
+    async def latest_date(self, probe: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Return the cached latest date, re-probing (async) when stale or signalled.
+        """
+        now = time.monotonic()
+        signal_version = read_signal_version()
+        signalled = signal_version != self._signal_version
+        stale = (
+            self._latest_date is None
+            or now - self._probed_at >= self.probe_interval
+            or signalled
+        )
+        if not stale:
+            return self._latest_date
+
+        latest = await probe()
+        with self._lock:
+            if latest != self._latest_date or signalled:
+                self._entries.clear()
+            self._latest_date = latest
+            self._probed_at = now
+            self._signal_version = signal_version
+        return latest
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache_lookup(entry is not None)
+        return entry
+
+    def set(self, key: Hashable, content: Any) -> CachedBody:
+        return self.put(key, CachedBody(render_json(content)))
+
+    def put(self, key: Hashable, entry: CachedBody) -> CachedBody:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest_date = None
@@ -57,4 +57,62 @@ class Config:
     RSI_OVERBOUGHT = 70
     RSI_OVERSOLD = 30
 
+    # API Response Cache
+    # Latest-date probe interval (sec). The batch also signals new data via a stamp file
+    # (last event; every event is appended to "<path>.log" with an increasing id).
+    API_CACHE_PROBE_INTERVAL = float(os.getenv("API_CACHE_PROBE_INTERVAL", "60"))
+    ANALYSIS_SIGNAL_PATH = os.getenv("ANALYSIS_SIGNAL_PATH", "data/analysis_updated.json")
+
+    # API DB Access
+    # Worker threads for blocking DB calls (keep <= HTTP connection pool size)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+    DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "10"))
+
+    # Pre-serialized JSON snapshots (written by the batch, served as static bytes)
+    # Empty = disabled (API reads the DB snapshot tables instead)
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+
+    # Server-push stream (/api/stream): seconds between checks of ANALYSIS_SIGNAL_PATH
+    EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "1"))
+
+    # Metrics: log requests slower than this (ms). 0 = disabled
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+    # Discord dispatch: above this many results a condensed digest is sent instead of one embed each
+    DISCORD_DIGEST_THRESHOLD = int(os.getenv("DISCORD_DIGEST_THRESHOLD", "30"))
+    DISCORD_MAX_RETRIES = int(os.getenv("DISCORD_MAX_RETRIES", "5"))
+
+    # Intraday AGGRESSIVE re-scoring (batch_jobs/intraday_rescore.py)
+    INTRADAY_INTERVAL = float(os.getenv("INTRADAY_INTERVAL", "180"))      # seconds between refresh cycles
+    INTRADAY_BATCH_SIZE = int(os.getenv("INTRADAY_BATCH_SIZE", "400"))    # tickers per quote request
+
+    # Sharded batch runs: plan / part files (batch_jobs/daily_analysis_all.py --shard i/N)
+    SHARD_DIR = os.getenv("SHARD_DIR", "data/shards")
+
+    # Batch market-data downloads: initial batch size (adapts to latency / errors),
+    # target seconds per request and retry rounds for failed symbols
+    DOWNLOAD_BATCH_SIZE = int(os.getenv("DOWNLOAD_BATCH_SIZE", "50"))
+    DOWNLOAD_TARGET_SECONDS = float(os.getenv("DOWNLOAD_TARGET_SECONDS", "20"))
+    DOWNLOAD_MAX_RETRIES = int(os.getenv("DOWNLOAD_MAX_RETRIES", "2"))
+
+    # Indicator pass of the batch on N worker processes sharing one OHLCV panel
+    # (services/ohlcv_panel.py); 0 or 1 = in-process, interleaved with the downloads
+    ANALYSIS_PROCESSES = int(os.getenv("ANALYSIS_PROCESSES", "0"))
+
+    # Parquet archive of market_analysis_log (services/archive.py), opt-in.
+    # Empty = the batch does not archive; readers (API / archive_history.py) use data/archive
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+
+    # /api/analytics/*: DuckDB queries over the archive (services/analytics.py), seconds per query
+    ANALYTICS_TIMEOUT = float(os.getenv("ANALYTICS_TIMEOUT", "30"))
+
+    # LLM quota (Gemma API limits) for the usage report of services/llm_telemetry.py
+    LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "30"))
+    LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "15000"))
+    LLM_DAILY_REQUEST_LIMIT = int(os.getenv("LLM_DAILY_REQUEST_LIMIT", "14400"))
+    # The daily quota resets at midnight Pacific time: usage days are bucketed in this zone
+    LLM_QUOTA_TIMEZONE = os.getenv("LLM_QUOTA_TIMEZONE", "America/Los_Angeles")
+    # Batch processes expected per quota day (each shard counts), for the end-of-day projection
+    LLM_RUNS_PER_DAY = int(os.getenv("LLM_RUNS_PER_DAY", "1"))
+
 config = Config()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from app import metrics
+from app.config import config
+from services.db_client import MAX_ROWS_PER_REQUEST
+
+# The Supabase (and SQLite) clients are synchronous. Run every DB call on a sized
+# thread pool so in-flight round trips never block the event loop; concurrency is
+# bounded by DB_POOL_SIZE, matching the HTTP connection pool of the client.
+_executor = ThreadPoolExecutor(max_workers=config.DB_POOL_SIZE, thread_name_prefix="db")
+
+
+async def run_sync(fn: Callable[..., Any], *args, timeout: float = None, **kwargs) -> Any:
+    """
+    Run a blocking DB helper on the DB thread pool with a per-query timeout.
+    Raises asyncio.TimeoutError if the call does not finish in time (the worker
+    thread is released when the underlying HTTP timeout fires).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = await asyncio.wait_for(future, timeout or config.DB_QUERY_TIMEOUT)
+        failed = False
+        return result
+    finally:
+        metrics.record_db_query(time.perf_counter() - started, failed=failed)
+
+
+async def run_query(query, timeout: float = None):
+    """
+    Execute a query builder (`supabase.table(...)...`) without blocking the event loop.
+    """
+    return await run_sync(query.execute, timeout=timeout)
+
+
+async def run_query_all(build_query: Callable[[], Any], page_size: int = MAX_ROWS_PER_REQUEST, timeout: float = None) -> list:
+    """
+    Execute an ordered query in pages of `page_size` rows (PostgREST caps rows per
+    request). `build_query` returns a fresh builder; usually one round trip.
+    """
+    rows = []
+    while True:
+        res = await run_query(build_query().range(len(rows), len(rows) + page_size - 1), timeout=timeout)
+        rows.extend(res.data)
+        if len(res.data) < page_size:
+            return rows
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
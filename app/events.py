@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from services.signals import event_id, latest_events, read_events, read_signal_version
+
+# Seconds between SSE keep-alive comments (proxies drop idle connections)
+HEARTBEAT_INTERVAL = 15.0
+# Per-client buffer; slow clients lose old events instead of blocking the watcher
+CLIENT_QUEUE_SIZE = 16
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id(event)}\nevent: {event.get('type', 'message')}\ndata: {data}\n\n".encode("utf-8")
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID sent by a reconnecting EventSource (0 when absent or not one of ours)."""
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+class EventBroadcaster:
+    """
+    Watches the batch's event log and fans new events out to SSE subscribers.
+    The watcher task starts with the first subscriber; each poll is a single os.stat()
+    of the stamp file, and the log is read (by event id) only when it changed.
+    """
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._version = read_signal_version()
+        self._last_id = max((event_id(e) for e in read_events()), default=0)
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_watcher(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    def _new_events(self) -> List[Dict[str, Any]]:
+        logged = read_events(0)
+        events = [e for e in logged if event_id(e) > self._last_id]
+        if logged and not events and event_id(logged[-1]) < self._last_id:
+            # Log and stamp were removed: the sequence restarted
+            events = logged
+        if events:
+            self._last_id = event_id(events[-1])
+        return events
+
+    async def _watch(self):
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            version = read_signal_version()
+            if version == self._version:
+                continue
+            self._version = version
+            for event in self._new_events():
+                self.publish(event)
+
+    def publish(self, event: Dict[str, Any]):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()  # Drop oldest
+            queue.put_nowait(event)
+
+    async def subscribe(self, last_event_id: int = 0) -> AsyncIterator[bytes]:
+        """
+        Latest event of each kind first (skipping what a reconnecting client already
+        has, per Last-Event-ID), then live events. Ids only move forward per client.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        self._ensure_watcher()
+        sent_id = last_event_id
+        try:
+            for event in latest_events():
+                if event_id(event) > sent_id:
+                    sent_id = event_id(event)
+                    yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event_id(event) > sent_id:
+                    sent_id = event_id(event)
+                    yield format_sse(event)
+        finally:
+            self._subscribers.discard(queue)
@@ -1,107 +1,561 @@
 
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import time
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from services.db_client import supabase
-from datetime import date
+from services import analytics, snapshot, snapshot_files
+from app import db, metrics
+from app.cache import CachedBody, ResponseCache, conditional_response
+from app.screener import ScreenerCache, NUMERIC_METRICS
+from app.events import EventBroadcaster, parse_last_event_id
+from app.config import config
+from datetime import date, timedelta
 from typing import Optional
 
 app = FastAPI(title="S-Stock AI Analyst API")
 
+# Pre-serialized responses keyed by (endpoint, mode, latest_date)
+response_cache = ResponseCache(probe_interval=config.API_CACHE_PROBE_INTERVAL)
+# In-memory columnar copy of the latest date for /api/screener
+screener_cache = ScreenerCache()
+# Pushes batch completion events (local event log) to /api/stream clients
+event_broadcaster = EventBroadcaster(poll_interval=config.EVENT_POLL_INTERVAL)
+
+async def _probe_latest_date() -> Optional[str]:
+    # Static snapshot pointer written by the batch (local file, no DB)
+    file_date = snapshot_files.read_pointer().get("analysis_date")
+    if file_date:
+        return file_date
+    # Date pointer published by the batch (primary-key read)
+    pointer = await db.run_sync(snapshot.read_snapshot, snapshot.ANALYSIS_DATE, columns="date")
+    if pointer:
+        return pointer["date"]
+    # Fallback: snapshot not published yet
+    res = await db.run_query(
+        supabase.table("market_analysis_log").select("date").order("date", desc=True).limit(1)
+    )
+    return res.data[0]["date"] if res.data else None
+
+async def _read_snapshot_rows(name: str, target_date: str):
+    """Rows from the latest snapshot, or None if missing / not for target_date."""
+    snap = await db.run_sync(snapshot.read_snapshot, name)
+    if snap and snap["date"] == target_date and snap["payload"] is not None:
+        return snap["payload"]
+    return None
+
+def _cached_snapshot_file(cache_key, target_date: Optional[str], name: Optional[str]) -> Optional[CachedBody]:
+    """Cache a pre-serialized snapshot file as-is (None if the batch did not write it)."""
+    if not name:
+        return None
+    data = snapshot_files.read_gzip(target_date, name)
+    if data is None:
+        return None
+    return response_cache.put(cache_key, CachedBody.from_gzip(data))
+
+DB_TIMEOUT_DETAIL = "Database query timed out"
+
+# Columns of market_analysis_log that clients may request via `fields=`
+ANALYSIS_FIELDS = [
+    "date", "ticker", "sector", "name_jp", "name_en", "close_price", "rsi_14", "atr_14",
+    "upside_ratio", "macro_score", "signal", "trend_strength", "correlation_us",
+    "exit_guideline", "performance_summary", "earnings_release_date", "reason",
+]
+# Slim default for paginated list views (no long text columns)
+LIST_FIELDS = [
+    "date", "ticker", "sector", "name_jp", "name_en", "close_price", "rsi_14",
+    "upside_ratio", "macro_score", "signal", "trend_strength", "correlation_us",
+]
+MAX_PAGE_SIZE = 1000
+
+# /api/history (bulk)
+HISTORY_FIELDS = ["date", "ticker", "close_price", "rsi_14", "upside_ratio", "macro_score", "signal", "trend_strength"]
+HISTORY_DEFAULT_DAYS = 90
+MAX_HISTORY_TICKERS = 100
+
+# /api/sectors
+SECTOR_DEFAULT_DAYS = 30
+SECTOR_MAX_DAYS = 120
+SECTOR_SERIES_FIELDS = ["buy_count", "aggressive_count", "avg_rsi", "above_sma75_ratio", "avg_correlation_us", "macro_score"]
+
+def _parse_fields(fields: Optional[str], default: list) -> list:
+    """
+    Validate a comma-separated `fields=` value ("*" = all columns).
+    `date` and `ticker` are always included (ticker is the pagination key).
+    """
+    if not fields:
+        return default
+    if fields.strip() == "*":
+        return ANALYSIS_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in ANALYSIS_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["date", "ticker"] + [f for f in requested if f not in ("date", "ticker")]
+
+@app.on_event("shutdown")
+def _shutdown_db_pool():
+    db.shutdown()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency, status, response size and DB usage (see /metrics)."""
+    stats = metrics.start_request()
+    started = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.REQUEST_LATENCY.observe(elapsed, route=path, method=request.method)
+        metrics.REQUESTS.inc(route=path, method=request.method, status=str(status))
+        metrics.DB_QUERIES_PER_REQUEST.observe(stats.db_queries, route=path)
+        metrics.DB_TIME_PER_REQUEST.observe(stats.db_seconds, route=path)
+        size = response.headers.get("content-length") if response is not None else None
+        if size is not None:
+            metrics.RESPONSE_SIZE.observe(int(size), route=path)
+        if config.SLOW_REQUEST_MS and elapsed * 1000 >= config.SLOW_REQUEST_MS:
+            print(
+                f"SLOW {request.method} {request.url.path}?{request.url.query} {status} "
+                f"{elapsed * 1000:.1f}ms (db: {stats.db_queries} queries, {stats.db_seconds * 1000:.1f}ms)"
+            )
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "S-Stock AI Analyst API (Read-Only) is running"}
 
+@app.get("/api/stream")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream of batch results.
+    - event "analysis": new analysis date with the recommendation diff
+      ({"date", "recommendations": {"added", "removed", "changed", "count", "previous_date"}})
+    - event "macro": new daily macro record
+    - event "intraday": re-scored tickers of the current date
+    Each event has an increasing `id`. The latest event of each kind is sent on connect,
+    minus those up to Last-Event-ID on reconnect; keep-alive comments every 15s.
+    """
+    return StreamingResponse(
+        event_broadcaster.subscribe(parse_last_event_id(request.headers.get("last-event-id"))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/recommendations")
-async def get_recommendations():
+async def get_recommendations(request: Request):
     try:
-        # 最新の日付を取得
-        latest_date_res = supabase.table("market_analysis_log").select("date").order("date", desc=True).limit(1).execute()
-        if not latest_date_res.data:
+        # 最新の日付を取得 (キャッシュ済み / 定期プローブ)
+        target_date = await response_cache.latest_date(_probe_latest_date)
+        if not target_date:
             return {"status": "no_data", "stocks": []}
-        
-        target_date = latest_date_res.data[0]["date"]
-        
-        # BUY or AGGRESSIVE シグナルを取得
-        # signal in ("BUY", "AGGRESSIVE")
-        res = supabase.table("market_analysis_log")\
-            .select("*")\
-            .eq("date", target_date)\
-            .in_("signal", ["BUY", "AGGRESSIVE"])\
-            .order("trend_strength", desc=True)\
-            .order("upside_ratio", desc=True)\
-            .execute()
-            
-        return {"status": "success", "date": target_date, "stocks": res.data}
+
+        cache_key = ("recommendations", None, target_date)
+        entry = response_cache.get(cache_key) \
+            or _cached_snapshot_file(cache_key, target_date, snapshot_files.RECOMMENDATIONS)
+        if entry is None:
+            stocks = await _read_snapshot_rows(snapshot.ANALYSIS_RECOMMEND, target_date)
+            if stocks is None:
+                # BUY or AGGRESSIVE シグナルを取得
+                # signal in ("BUY", "AGGRESSIVE")
+                res = await db.run_query(
+                    supabase.table("market_analysis_log")
+                    .select(",".join(ANALYSIS_FIELDS))
+                    .eq("date", target_date)
+                    .in_("signal", ["BUY", "AGGRESSIVE"])
+                    .order("trend_strength", desc=True)
+                    .order("upside_ratio", desc=True)
+                )
+                stocks = res.data
+            entry = response_cache.set(cache_key, snapshot_files.build_recommendations_content(target_date, stocks))
+
+        return conditional_response(request, entry)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/latest")
-async def get_latest_analysis(mode: str = "all"):
+async def get_latest_analysis(
+    request: Request,
+    mode: str = "all",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    sector: Optional[str] = None,
+):
     """
     Get the latest analysis data.
     - mode="recommend": Returns only BUY/AGGRESSIVE signals (Lightweight)
     - mode="all": Returns all stocks (Heavy)
+
+    Pagination / projection:
+    - limit, cursor (mode="all" only): keyset pagination on ticker. Pass the
+      returned `next_cursor` to get the following page. Paginated requests
+      default to the slim LIST_FIELDS column set.
+    - fields: comma-separated column list pushed into the DB select ("*" = all).
+    - sector: only stocks of this (JPX English) sector.
     """
+    # Anything other than "recommend" is served as "all" (bounded cache keys)
+    mode = "recommend" if mode == "recommend" else "all"
+    paginated = mode == "all" and (limit is not None or cursor is not None)
+    if paginated or fields:
+        columns = _parse_fields(fields, LIST_FIELDS if paginated else ANALYSIS_FIELDS)
+    else:
+        columns = None
+    if paginated and limit is None:
+        limit = MAX_PAGE_SIZE
+
     try:
-        # Get latest date
-        latest_date_res = supabase.table("market_analysis_log").select("date").order("date", desc=True).limit(1).execute()
-        if not latest_date_res.data:
+        # Get latest date (cached, re-probed periodically or on batch signal)
+        target_date = await response_cache.latest_date(_probe_latest_date)
+        if not target_date:
             return {"status": "no_data", "stocks": []}
-        
-        target_date = latest_date_res.data[0]["date"]
-        
-        query = supabase.table("market_analysis_log").select("*").eq("date", target_date)
-        
-        # Mode-based filtering
-        if mode == "recommend":
-            query = query.in_("signal", ["BUY", "AGGRESSIVE"])
-            # Add ordering for recommendation view
-            query = query.order("trend_strength", desc=True).order("upside_ratio", desc=True)
-        else:
-            # For "all", maybe order by sector or ticker?
-            query = query.order("ticker", desc=False)
-            
-        res = query.execute()
-            
-        return {"status": "success", "date": target_date, "mode": mode, "count": len(res.data), "stocks": res.data}
+
+        cache_key = ("latest", mode, target_date, sector, cursor, limit, tuple(columns) if columns else None)
+        entry = response_cache.get(cache_key)
+        if entry is None and columns is None:
+            # Pre-serialized static snapshot written by the batch
+            if sector:
+                file_name = snapshot_files.resolve_sector_file(target_date, sector) if mode == "all" else None
+            else:
+                file_name = snapshot_files.LATEST_RECOMMEND if mode == "recommend" else snapshot_files.LATEST_ALL
+            entry = _cached_snapshot_file(cache_key, target_date, file_name)
+        if entry is None:
+            next_cursor = None
+            if columns is None:
+                snapshot_name = snapshot.ANALYSIS_RECOMMEND if mode == "recommend" else snapshot.ANALYSIS_ALL
+                stocks = await _read_snapshot_rows(snapshot_name, target_date)
+                if stocks is not None and sector:
+                    stocks = [r for r in stocks if r.get("sector") == sector]
+            else:
+                stocks = None
+
+            if stocks is None:
+                query = supabase.table("market_analysis_log")\
+                    .select(",".join(columns or ANALYSIS_FIELDS))\
+                    .eq("date", target_date)
+                if sector:
+                    query = query.eq("sector", sector)
+
+                # Mode-based filtering
+                if mode == "recommend":
+                    query = query.in_("signal", ["BUY", "AGGRESSIVE"])
+                    # Add ordering for recommendation view
+                    query = query.order("trend_strength", desc=True).order("upside_ratio", desc=True)
+                else:
+                    # Keyset pagination over the (date, ticker) primary key
+                    if cursor:
+                        query = query.gt("ticker", cursor)
+                    query = query.order("ticker", desc=False)
+                    if paginated:
+                        # One extra row tells us whether another page exists
+                        query = query.limit(limit + 1)
+
+                stocks = (await db.run_query(query)).data
+                if paginated and len(stocks) > limit:
+                    stocks = stocks[:limit]
+                    next_cursor = stocks[-1]["ticker"]
+
+            content = snapshot_files.build_latest_content(target_date, mode, stocks, sector=sector)
+            if paginated:
+                content["next_cursor"] = next_cursor
+            entry = response_cache.set(cache_key, content)
+
+        return conditional_response(request, entry)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/history")
+async def get_bulk_history(
+    tickers: str,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    fields: Optional[str] = None,
+):
+    """
+    History of many tickers in one request (watchlists).
+    - tickers: comma-separated, e.g. "7203.T,9984.T"
+    - from / to: YYYY-MM-DD (inclusive). Defaults to the last HISTORY_DEFAULT_DAYS days.
+    - fields: columns to return (default HISTORY_FIELDS)
+    Returns compact columnar arrays per ticker: {"7203.T": {"date": [...], "close_price": [...]}}
+    """
+    ticker_list = list(dict.fromkeys(t.strip() for t in tickers.split(",") if t.strip()))
+    if not ticker_list:
+        raise HTTPException(status_code=400, detail="tickers is required")
+    if len(ticker_list) > MAX_HISTORY_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HISTORY_TICKERS} tickers per request")
+    try:
+        end = date.fromisoformat(date_to) if date_to else date.today()
+        start = date.fromisoformat(date_from) if date_from else end - timedelta(days=HISTORY_DEFAULT_DAYS)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be YYYY-MM-DD")
+    columns = _parse_fields(fields, HISTORY_FIELDS)
+    series_columns = [c for c in columns if c != "ticker"]
+
+    try:
+        # One in_() query over the (ticker, date) index; paged only past the server row cap
+        rows = await db.run_query_all(
+            lambda: supabase.table("market_analysis_log")
+            .select(",".join(columns))
+            .in_("ticker", ticker_list)
+            .gte("date", start.isoformat())
+            .lte("date", end.isoformat())
+            .order("ticker", desc=False)
+            .order("date", desc=False)
+        )
+
+        series = {t: {c: [] for c in series_columns} for t in ticker_list}
+        for row in rows:
+            columns_of_ticker = series.get(row["ticker"])
+            if columns_of_ticker is None:
+                continue
+            for c in series_columns:
+                columns_of_ticker[c].append(row.get(c))
+
+        return {
+            "status": "success",
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "fields": series_columns,
+            "tickers": series,
+        }
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/history/{ticker}")
 async def get_stock_history(ticker: str):
     try:
-        # 指定銘柄の全履歴（または直近90件）を取得
-        res = supabase.table("market_analysis_log")\
-            .select("*")\
-            .eq("ticker", ticker)\
-            .order("date", desc=False)\
-            .limit(90)\
-            .execute()
-            
-        return {"status": "success", "ticker": ticker, "history": res.data}
+        # 指定銘柄の直近90件を取得 (新しい順に取得して古い順に並べ替え)
+        res = await db.run_query(
+            supabase.table("market_analysis_log")
+            .select(",".join(ANALYSIS_FIELDS))
+            .eq("ticker", ticker)
+            .order("date", desc=True)
+            .limit(90)
+        )
+
+        return {"status": "success", "ticker": ticker, "history": list(reversed(res.data))}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _load_all_rows(target_date: str):
+    """All rows of a date (snapshot first, DB fallback) for in-memory indexes."""
+    rows = await _read_snapshot_rows(snapshot.ANALYSIS_ALL, target_date)
+    if rows is None:
+        rows = await db.run_query_all(
+            lambda: supabase.table("market_analysis_log")
+            .select(",".join(LIST_FIELDS))
+            .eq("date", target_date)
+            .order("ticker", desc=False)
+        )
+    return rows
+
+def _split_values(value: Optional[str]) -> list:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+@app.get("/api/screener")
+async def screen_stocks(
+    rsi_14_min: Optional[float] = None,
+    rsi_14_max: Optional[float] = None,
+    upside_ratio_min: Optional[float] = None,
+    upside_ratio_max: Optional[float] = None,
+    correlation_us_min: Optional[float] = None,
+    correlation_us_max: Optional[float] = None,
+    macro_score_min: Optional[float] = None,
+    macro_score_max: Optional[float] = None,
+    sector: Optional[str] = None,
+    signal: Optional[str] = None,
+    trend_strength: Optional[str] = None,
+    sort: Optional[str] = "-upside_ratio",
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Screen the latest date in memory (no DB access after the first load per date).
+    - *_min / *_max: inclusive range predicates
+    - sector, signal, trend_strength: comma-separated allowed values (e.g. "S,A")
+    - sort: metric name, "-" prefix for descending (rsi_14, upside_ratio,
+      correlation_us, macro_score, close_price, trend_rank)
+    - limit: top-K
+    """
+    descending = bool(sort) and sort.startswith("-")
+    sort_key = sort.lstrip("-") if sort else None
+    if sort_key and sort_key not in NUMERIC_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort_key}")
+
+    try:
+        target_date = await response_cache.latest_date(_probe_latest_date)
+        if not target_date:
+            return {"status": "no_data", "stocks": []}
+
+        index = await screener_cache.get(target_date, _load_all_rows)
+        total, stocks = index.query(
+            ranges={
+                "rsi_14": (rsi_14_min, rsi_14_max),
+                "upside_ratio": (upside_ratio_min, upside_ratio_max),
+                "correlation_us": (correlation_us_min, correlation_us_max),
+                "macro_score": (macro_score_min, macro_score_max),
+            },
+            categories={
+                col: values for col, values in (
+                    ("sector", _split_values(sector)),
+                    ("signal", _split_values(signal)),
+                    ("trend_strength", _split_values(trend_strength)),
+                ) if values
+            },
+            sort=sort_key,
+            descending=descending,
+            limit=limit,
+        )
+        return {
+            "status": "success",
+            "date": target_date,
+            "total": total,
+            "count": len(stocks),
+            "stocks": [{f: row.get(f) for f in LIST_FIELDS} for row in stocks],
+        }
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/sectors")
+async def get_sectors(request: Request, days: int = Query(SECTOR_DEFAULT_DAYS, ge=1, le=SECTOR_MAX_DAYS)):
+    """
+    Precomputed sector aggregates (signal counts, avg RSI, share above SMA75,
+    mean correlation, macro score) for the latest date, plus a short time series
+    covering the last `days` calendar days.
+    """
+    try:
+        target_date = await response_cache.latest_date(_probe_latest_date)
+        if not target_date:
+            return {"status": "no_data", "sectors": []}
+
+        cache_key = ("sectors", days, target_date)
+        entry = response_cache.get(cache_key)
+        if entry is None:
+            start = (date.fromisoformat(target_date) - timedelta(days=days - 1)).isoformat()
+            rows = await db.run_query_all(
+                lambda: supabase.table("sector_daily_log")
+                .select("*")
+                .gte("date", start)
+                .lte("date", target_date)
+                .order("sector", desc=False)
+                .order("date", desc=False)
+            )
+
+            latest = [r for r in rows if r["date"] == target_date]
+            series = {}
+            for r in rows:
+                cols = series.setdefault(r["sector"], {"date": [], **{m: [] for m in SECTOR_SERIES_FIELDS}})
+                cols["date"].append(r["date"])
+                for m in SECTOR_SERIES_FIELDS:
+                    cols[m].append(r.get(m))
+
+            entry = response_cache.set(cache_key, {
+                "status": "success",
+                "date": target_date,
+                "sectors": latest,
+                "series": series,
+            })
+
+        return conditional_response(request, entry)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/macro/latest")
-def get_latest_macro():
+async def get_latest_macro(request: Request):
     """
     Get the latest macro environment analysis.
     """
     try:
-        target_date = date.today().isoformat()
-        response = supabase.table("daily_macro_log") \
-            .select("*") \
-            .eq("date", target_date) \
-            .execute()
-            
-        if not response.data:
-            # Fallback to mostly recent if today not done yet?
-            response = supabase.table("daily_macro_log") \
-                .select("*") \
-                .order("date", desc=True) \
-                .limit(1) \
-                .execute()
-                
-        return {"data": response.data[0] if response.data else None}
+        # Invalidated with the analysis date / batch signal like the other read endpoints
+        latest_date = await response_cache.latest_date(_probe_latest_date)
+        cache_key = ("macro", None, latest_date)
+        entry = response_cache.get(cache_key) or _cached_snapshot_file(
+            cache_key, snapshot_files.read_pointer().get("macro_date"), snapshot_files.MACRO
+        )
+        if entry is None:
+            # Latest snapshot published by the batch (single read)
+            snap = await db.run_sync(snapshot.read_snapshot, snapshot.MACRO)
+            if snap and snap["payload"] is not None:
+                record = snap["payload"]
+            else:
+                target_date = date.today().isoformat()
+                response = await db.run_query(
+                    supabase.table("daily_macro_log")
+                    .select("*")
+                    .eq("date", target_date)
+                )
+
+                if not response.data:
+                    # Fallback to mostly recent if today not done yet?
+                    response = await db.run_query(
+                        supabase.table("daily_macro_log")
+                        .select("*")
+                        .order("date", desc=True)
+                        .limit(1)
+                    )
+                record = response.data[0] if response.data else None
+            entry = response_cache.set(cache_key, snapshot_files.build_macro_content(record))
+
+        return conditional_response(request, entry)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=DB_TIMEOUT_DETAIL)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics")
+def list_analytics():
+    """
+    Named analytical queries over the local Parquet archive and their parameters.
+    """
+    return {"status": "success", "queries": analytics.describe()}
+
+@app.get("/api/analytics/{name}")
+async def run_analytics(name: str, request: Request):
+    """
+    Run a named query from the analytics library (read-only, archive files only; no
+    production DB access). Parameters come from the query string, e.g.
+    /api/analytics/stop_hits?sector=Electric%20Appliances&atr_mult=2&horizon=10.
+    Results are cached until the archive files change.
+    """
+    if name not in analytics.QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query: {name}")
+    try:
+        params = analytics.validate(name, dict(request.query_params))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        signature = await db.run_sync(analytics.engine.signature)
+        cache_key = ("analytics", name, tuple(sorted(params.items())), signature)
+        entry = response_cache.get(cache_key)
+        if entry is None:
+            result = await db.run_sync(analytics.engine.run, name, params, timeout=config.ANALYTICS_TIMEOUT)
+            entry = response_cache.set(cache_key, {"status": "success", **result})
+        return conditional_response(request, entry)
+    except ImportError:
+        raise HTTPException(status_code=503, detail="Analytics unavailable (duckdb not installed)")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Analytics query timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,176 @@
+import contextvars
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prometheus-style metrics kept in process (no client library needed).
+# Exposed as text exposition format at /metrics.
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Tuple[str, str] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: List[float]):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series: Dict[Labels, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            idx = bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            items = [(k, list(v)) for k, v in items]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', repr(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value read at scrape time from a callback returning {labels: value}."""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "End-to-end request latency by route.", LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "api_response_size_bytes", "Response body size by route (as sent, after compression).", SIZE_BUCKETS
+)
+REQUESTS = Counter("api_requests_total", "Requests by route, method and status.")
+DB_QUERY_LATENCY = Histogram(
+    "api_db_query_duration_seconds", "DB round-trip latency (thread-pool offloaded calls).", LATENCY_BUCKETS
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "api_db_queries_per_request", "DB round trips per request by route.", [0, 1, 2, 3, 5, 10, 20]
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "api_db_time_per_request_seconds", "Total DB time per request by route.", LATENCY_BUCKETS
+)
+DB_ERRORS = Counter("api_db_errors_total", "DB calls that raised or timed out.")
+CACHE_LOOKUPS = Counter("api_cache_lookups_total", "Response cache lookups by result (hit/miss).")
+
+
+def _cache_hit_ratio() -> Dict[Labels, float]:
+    values = CACHE_LOOKUPS.values()
+    hits = values.get((("result", "hit"),), 0)
+    total = hits + values.get((("result", "miss"),), 0)
+    return {(): round(hits / total, 4) if total else 0.0}
+
+
+CACHE_HIT_RATIO = Gauge("api_cache_hit_ratio", "Response cache hits / lookups since start.", _cache_hit_ratio)
+
+_registry: list = [REQUEST_LATENCY, RESPONSE_SIZE, REQUESTS, DB_QUERY_LATENCY, DB_QUERIES_PER_REQUEST,
+                   DB_TIME_PER_REQUEST, DB_ERRORS, CACHE_LOOKUPS, CACHE_HIT_RATIO]
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Per-request DB accounting ---
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def record_db_query(seconds: float, failed: bool = False):
+    DB_QUERY_LATENCY.observe(seconds)
+    if failed:
+        DB_ERRORS.inc()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+
+
+def record_cache_lookup(hit: bool):
+    CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
@@ -0,0 +1,129 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Numeric metrics with a sorted index (range predicates + sort keys)
+NUMERIC_METRICS = ["rsi_14", "upside_ratio", "correlation_us", "macro_score", "close_price", "trend_rank"]
+# Categorical columns with an inverted index (equality / IN predicates)
+CATEGORICAL_COLUMNS = ["sector", "signal", "trend_strength"]
+
+TREND_RANK = {"C": 0, "B": 1, "A": 2, "S": 3}
+
+
+class SortedIndex:
+    """Values sorted ascending with their row ids; range lookups by binary search."""
+
+    __slots__ = ("values", "row_ids")
+
+    def __init__(self, column: List[Optional[float]]):
+        pairs = sorted((v, i) for i, v in enumerate(column) if v is not None)
+        self.values = [v for v, _ in pairs]
+        self.row_ids = [i for _, i in pairs]
+
+    def range(self, low: Optional[float], high: Optional[float]) -> List[int]:
+        start = bisect_left(self.values, low) if low is not None else 0
+        end = bisect_right(self.values, high) if high is not None else len(self.values)
+        return self.row_ids[start:end]
+
+
+class ScreenerIndex:
+    """
+    Columnar, in-memory copy of one analysis date with per-metric sorted indexes.
+    Built once per date; every query is answered without touching the DB.
+    """
+
+    def __init__(self, target_date: str, rows: List[Dict[str, Any]]):
+        self.date = target_date
+        self.rows = rows
+        self.columns: Dict[str, List[Any]] = {}
+        for metric in NUMERIC_METRICS:
+            if metric == "trend_rank":
+                column = [TREND_RANK.get(r.get("trend_strength")) for r in rows]
+            else:
+                column = [r.get(metric) for r in rows]
+            self.columns[metric] = column
+        self.sorted_indexes = {m: SortedIndex(self.columns[m]) for m in NUMERIC_METRICS}
+        self.inverted: Dict[str, Dict[Any, Set[int]]] = {}
+        for col in CATEGORICAL_COLUMNS:
+            inverted: Dict[Any, Set[int]] = {}
+            for i, r in enumerate(rows):
+                inverted.setdefault(r.get(col), set()).add(i)
+            self.inverted[col] = inverted
+
+    def query(
+        self,
+        ranges: Dict[str, tuple],
+        categories: Dict[str, Iterable[str]],
+        sort: Optional[str] = None,
+        descending: bool = True,
+        limit: int = 50,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        ranges: {metric: (low, high)} inclusive, None = open
+        categories: {column: values}
+        Returns (total matches, top-`limit` rows by `sort`).
+        """
+        candidate_sets: List[Set[int]] = []
+        for metric, (low, high) in ranges.items():
+            if low is None and high is None:
+                continue
+            candidate_sets.append(set(self.sorted_indexes[metric].range(low, high)))
+        for col, values in categories.items():
+            inverted = self.inverted[col]
+            matched: Set[int] = set()
+            for v in values:
+                matched |= inverted.get(v, set())
+            candidate_sets.append(matched)
+
+        if candidate_sets:
+            # Intersect smallest first
+            candidate_sets.sort(key=len)
+            candidates = candidate_sets[0]
+            for other in candidate_sets[1:]:
+                candidates = candidates & other
+                if not candidates:
+                    break
+        else:
+            candidates = None  # No predicate: whole universe
+
+        total = len(self.rows) if candidates is None else len(candidates)
+        if sort:
+            # Walk the pre-sorted index of the sort key and stop at K hits
+            index = self.sorted_indexes[sort]
+            ordered = reversed(index.row_ids) if descending else iter(index.row_ids)
+            top = []
+            for i in ordered:
+                if candidates is None or i in candidates:
+                    top.append(i)
+                    if len(top) >= limit:
+                        break
+            if len(top) < limit:
+                # Rows without a value for the sort key go last
+                seen = set(top)
+                for i in range(len(self.rows)) if candidates is None else sorted(candidates):
+                    if i not in seen and self.columns[sort][i] is None:
+                        top.append(i)
+                        if len(top) >= limit:
+                            break
+        else:
+            ids = range(len(self.rows)) if candidates is None else sorted(candidates)
+            top = list(ids)[:limit]
+        return total, [self.rows[i] for i in top]
+
+
+class ScreenerCache:
+    """Holds the ScreenerIndex of the latest date; rebuilt once when the date changes."""
+
+    def __init__(self):
+        self._index: Optional[ScreenerIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, target_date: str, load_rows: Callable[[str], Awaitable[List[Dict[str, Any]]]]) -> ScreenerIndex:
+        index = self._index
+        if index is not None and index.date == target_date:
+            return index
+        async with self._lock:
+            if self._index is None or self._index.date != target_date:
+                rows = await load_rows(target_date)
+                self._index = ScreenerIndex(target_date, rows)
+            return self._index
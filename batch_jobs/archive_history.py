@@ -0,0 +1,166 @@
+"""
+Parquet archive of market_analysis_log (services/archive.py).
+
+    # Backfill from the DB (one file per date), then compact finished months
+    PYTHONPATH=. python batch_jobs/archive_history.py backfill --from 2025-10-01 --to 2026-10-19
+    PYTHONPATH=. python batch_jobs/archive_history.py compact
+    # Time a year-long scan (signal frequency per sector)
+    PYTHONPATH=. python batch_jobs/archive_history.py scan --days 365
+    # Daily OHLCV bars for the prime universe (rerun with a recent --from to keep it current)
+    PYTHONPATH=. python batch_jobs/archive_history.py ohlcv --from 2025-10-01
+    # Named analytical query over the archive (services/analytics.py)
+    PYTHONPATH=. python batch_jobs/archive_history.py query stop_hits --param sector="Electric Appliances"
+"""
+import os
+import sys
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import archive
+from app.config import config
+
+
+def backfill(start: str, end: str, base_dir: str = None):
+    """
+    Export [start, end] from the DB, one archive file per date (existing files are replaced).
+    Reads date by date (indexed equality, at most a couple of pages each) instead of
+    offset-paging the whole range.
+    """
+    from services.db_client import supabase, fetch_all
+
+    select = ", ".join(archive.columns())
+    written, rows_total = 0, 0
+    started = time.perf_counter()
+    day = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    while day <= last:
+        day_str = day.isoformat()
+        day += timedelta(days=1)
+        rows = fetch_all(lambda: supabase.table(archive.TABLE).select(select).eq("date", day_str).order("ticker"))
+        if rows:
+            archive.append_day(day_str, rows, base_dir)
+            written += 1
+            rows_total += len(rows)
+    print(f">>> Backfilled {rows_total} rows into {written} daily files in {time.perf_counter() - started:.1f}s.")
+
+
+def backfill_ohlcv(start: str, end: str, base_dir: str = None, tickers_file: str = "batch_jobs/data/prime_tickers.csv"):
+    """Download daily bars for the universe over [start, end] into the OHLCV archive."""
+    import pandas as pd
+    import yfinance as yf
+    from services.download_scheduler import DownloadScheduler
+
+    tickers = pd.read_csv(tickers_file)["ticker"].tolist()
+    # yfinance `end` is exclusive
+    end_exclusive = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+
+    def download_chunk(batch):
+        data = yf.download(batch, start=start, end=end_exclusive, group_by="ticker", auto_adjust=True, threads=True)
+        return data, dict(getattr(getattr(yf, "shared", None), "_ERRORS", None) or {})
+
+    scheduler = DownloadScheduler(
+        download_chunk,
+        batch_size=config.DOWNLOAD_BATCH_SIZE,
+        target_seconds=config.DOWNLOAD_TARGET_SECONDS,
+        max_retries=config.DOWNLOAD_MAX_RETRIES,
+    )
+    started = time.perf_counter()
+    frames = dict(scheduler.iter_frames(tickers))
+    scheduler.print_report()
+    written = archive.append_ohlcv(frames, start, end, base_dir)
+    print(f">>> Archived bars of {len(frames)} tickers into {written} daily files in {time.perf_counter() - started:.1f}s.")
+
+
+def compact(month: str = None, base_dir: str = None, include_current: bool = False):
+    current = datetime.now().strftime("%Y-%m")
+    for table in (archive.TABLE, archive.OHLCV):
+        targets = [month] if month else [m for m in archive.months(base_dir, table) if include_current or m < current]
+        for m in targets:
+            result = archive.compact_month(m, base_dir, table)
+            if result:
+                print(f"    {table} {m}: {result['merged_files']} files -> {result['rows']} rows, {result['bytes'] / 1024:.0f} KB")
+        stats = archive.archive_stats(base_dir, table)
+        print(f">>> {table}: {stats['months']} months, {stats['files']} files, {stats['bytes'] / 1024 / 1024:.1f} MB")
+
+
+def scan(days: int, base_dir: str = None):
+    """Signal frequency per sector over `days`: the typical multi-month analytical read."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    end = date.today()
+    start = end - timedelta(days=days)
+    started = time.perf_counter()
+    table = archive.read(start.isoformat(), end.isoformat(), columns=["sector", "signal"], base_dir=base_dir)
+    loaded = time.perf_counter()
+    counts = table.group_by(["sector", "signal"]).aggregate([("signal", "count")])
+    elapsed = time.perf_counter() - started
+    print(f">>> {table.num_rows} rows over {days} days: read {loaded - started:.3f}s, total {elapsed:.3f}s")
+    recommended = counts.filter(pc.is_in(counts["signal"].cast("string"), value_set=pa.array(["BUY", "AGGRESSIVE"])))
+    for row in sorted(recommended.to_pylist(), key=lambda r: -r["signal_count"])[:10]:
+        print(f"    {row['sector']:<40} {row['signal']:<11} {row['signal_count']}")
+
+
+def query(name: str, params: list, base_dir: str = None, limit: int = 30):
+    from services import analytics
+
+    values = dict(p.split("=", 1) for p in params)
+    started = time.perf_counter()
+    try:
+        result = analytics.run(name, values, base_dir)
+    except KeyError:
+        print(f"!!! Unknown query '{name}' (available: {', '.join(analytics.QUERIES)})")
+        return
+    except ValueError as e:
+        print(f"!!! {e}")
+        return
+    print(f">>> {name} {result['params']}: {len(result['rows'])} rows in {time.perf_counter() - started:.3f}s")
+    print("    " + " | ".join(result["columns"]))
+    for row in result["rows"][:limit]:
+        print("    " + " | ".join(str(row[c]) for c in result["columns"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parquet archive of market_analysis_log")
+    parser.add_argument("--archive-dir", default=None, help=f"Archive root (default {config.ARCHIVE_DIR or archive.DEFAULT_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_backfill = sub.add_parser("backfill", help="Export a date range from the DB")
+    p_backfill.add_argument("--from", dest="start", required=True)
+    p_backfill.add_argument("--to", dest="end", default=date.today().isoformat())
+
+    p_compact = sub.add_parser("compact", help="Merge daily files into one file per month")
+    p_compact.add_argument("--month", default=None, help="YYYY-MM (default: every finished month)")
+    p_compact.add_argument("--include-current", action="store_true")
+
+    p_scan = sub.add_parser("scan", help="Time a multi-day analytical scan")
+    p_scan.add_argument("--days", type=int, default=365)
+
+    p_ohlcv = sub.add_parser("ohlcv", help="Download daily bars of the universe into the archive")
+    p_ohlcv.add_argument("--from", dest="start", required=True)
+    p_ohlcv.add_argument("--to", dest="end", default=date.today().isoformat())
+
+    p_query = sub.add_parser("query", help="Run a named analytical query (services/analytics.py)")
+    p_query.add_argument("name")
+    p_query.add_argument("--param", action="append", default=[], help="name=value (repeatable)")
+
+    args = parser.parse_args()
+    base_dir = args.archive_dir or config.ARCHIVE_DIR or archive.DEFAULT_DIR
+
+    if args.command == "backfill":
+        backfill(args.start, args.end, base_dir)
+    elif args.command == "compact":
+        compact(args.month, base_dir, args.include_current)
+    elif args.command == "scan":
+        scan(args.days, base_dir)
+    elif args.command == "ohlcv":
+        backfill_ohlcv(args.start, args.end, base_dir)
+    elif args.command == "query":
+        query(args.name, args.param, base_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Intraday re-scoring of the AGGRESSIVE trigger.
+
+The daily batch evaluates AGGRESSIVE (volume surge vs Vol_SMA5, Close > SMA5,
+positive candle, SMA5 rising, RSI < 60) once at 07:00 JST on the previous
+session. This job keeps the completed daily bars of the universe in memory,
+polls current quotes in large batches during market hours, overwrites only the
+trailing (today's) bar and re-evaluates the rule for every ticker in one
+vectorized step. Only names that newly trigger are upserted and notified.
+
+    PYTHONPATH=. python batch_jobs/intraday_rescore.py
+    PYTHONPATH=. python batch_jobs/intraday_rescore.py --once --interval 120
+"""
+import os
+import sys
+import asyncio
+import argparse
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.db_client import supabase, fetch_all
+from services.signals import publish_analysis_update
+from services.content_hash import HASH_COLUMN
+from app.config import config
+
+HISTORY_BARS = 25          # Completed daily bars kept per ticker (BB20 / RSI14 / ATR14 / SMA5)
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# TSE sessions (JST): 09:00-11:30, 12:30-15:30
+SESSIONS = [((9, 0), (11, 30)), ((12, 30), (15, 30))]
+SESSION_MINUTES = sum((e[0] * 60 + e[1]) - (s[0] * 60 + s[1]) for s, e in SESSIONS)
+
+
+def now_jst() -> datetime:
+    from zoneinfo import ZoneInfo
+    return datetime.now(ZoneInfo("Asia/Tokyo")).replace(tzinfo=None)
+
+
+def session_progress(now: datetime) -> float:
+    """Share of today's trading minutes elapsed (0.0 before the open, 1.0 after the close)."""
+    minute = now.hour * 60 + now.minute
+    elapsed = 0
+    for (sh, sm), (eh, em) in SESSIONS:
+        start, end = sh * 60 + sm, eh * 60 + em
+        elapsed += max(0, min(minute, end) - start)
+    return elapsed / SESSION_MINUTES
+
+
+def market_open(now: datetime) -> bool:
+    return now.weekday() < 5 and 0.0 < session_progress(now) < 1.0
+
+
+class IndicatorState:
+    """
+    Completed daily bars of the whole universe as (tickers x HISTORY_BARS + 1) arrays.
+    The last column is today's bar and is the only part rewritten on each refresh.
+    """
+
+    def __init__(self, tickers):
+        import numpy as np
+
+        self.tickers = list(tickers)
+        self.position = {t: i for i, t in enumerate(self.tickers)}
+        shape = (len(self.tickers), HISTORY_BARS + 1)
+        self.bars = {f: np.full(shape, np.nan) for f in FIELDS}
+        self.has_history = np.zeros(len(self.tickers), dtype=bool)
+
+    def load_history(self, frame, today):
+        """frame: yfinance download (group_by='ticker'); bars dated today are dropped."""
+        import numpy as np
+
+        frame = frame[frame.index.normalize() < today.strftime("%Y-%m-%d")]
+        for ticker, i in self.position.items():
+            if ticker not in frame.columns.get_level_values(0):
+                continue
+            df = frame[ticker].dropna(subset=["Close"]).tail(HISTORY_BARS)
+            if len(df) < HISTORY_BARS:
+                continue
+            for f in FIELDS:
+                self.bars[f][i, :-1] = df[f].to_numpy(dtype=float)
+            self.has_history[i] = True
+        print(f"    Indicator state: {int(np.sum(self.has_history))}/{len(self.tickers)} tickers with full history.")
+
+    def update_trailing(self, quotes):
+        """quotes: DataFrame indexed by ticker with FIELDS columns (today's bar so far)."""
+        import numpy as np
+
+        rows = [self.position[t] for t in quotes.index if t in self.position]
+        if not rows:
+            return 0
+        known = quotes.loc[[t for t in quotes.index if t in self.position]]
+        for f in FIELDS:
+            self.bars[f][rows, -1] = known[f].to_numpy(dtype=float)
+        return int(np.sum(~np.isnan(known["Close"].to_numpy(dtype=float))))
+
+    def evaluate(self, volume_scale: float = 1.0):
+        """
+        Vectorized AGGRESSIVE rule (same thresholds as daily_analysis_all.py) on every ticker.
+        volume_scale projects today's partial volume to a full session.
+        """
+        import numpy as np
+
+        o, h, l, c, v = (self.bars[f] for f in FIELDS)
+        v = v.copy()
+        v[:, -1] *= volume_scale
+
+        close, opn, volume = c[:, -1], o[:, -1], v[:, -1]
+        sma5 = c[:, -5:].mean(axis=1)
+        prev_sma5 = c[:, -6:-1].mean(axis=1)
+        vol_sma5 = v[:, -5:].mean(axis=1)
+
+        # RSI 14 (simple rolling mean of gains / losses, as in the daily batch)
+        delta = np.diff(c[:, -15:], axis=1)
+        gain = np.where(delta > 0, delta, 0.0).mean(axis=1)
+        loss = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - (100 / (1 + gain / loss))
+        rsi = np.where(loss == 0, 100.0, rsi)
+
+        # ATR 14 and BB upper (20, 2)
+        prev_close = c[:, -15:-1]
+        true_range = np.maximum.reduce([
+            h[:, -14:] - l[:, -14:],
+            np.abs(h[:, -14:] - prev_close),
+            np.abs(l[:, -14:] - prev_close),
+        ])
+        atr = true_range.mean(axis=1)
+        bb_upper = c[:, -20:].mean(axis=1) + 2 * c[:, -20:].std(axis=1, ddof=1)
+
+        with np.errstate(invalid="ignore"):
+            triggered = (
+                self.has_history
+                & ~np.isnan(close)
+                & (rsi < 60)
+                & (close > sma5)
+                & (volume > vol_sma5 * 1.5)
+                & (close > opn)
+                & (sma5 > prev_sma5)
+            )
+            upside = np.where(atr > 0, (bb_upper - close) / atr, 0.0)
+        return triggered, {
+            "close": close, "rsi": rsi, "atr": atr, "sma5": sma5,
+            "bb_upper": bb_upper, "upside": np.nan_to_num(upside, nan=0.0, posinf=0.0, neginf=0.0),
+        }
+
+
+def download_batches(tickers, batch_size: int, **kwargs):
+    """yf.download in large batches; returns one frame with (ticker, field) columns."""
+    import pandas as pd
+    import yfinance as yf
+
+    frames = []
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        try:
+            data = yf.download(batch, group_by="ticker", auto_adjust=True, threads=True, progress=False, **kwargs)
+        except Exception as e:
+            print(f"!!! Download error (batch {i}): {e}")
+            continue
+        if data is None or data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([batch, data.columns])
+        frames.append(data)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
+
+
+def fetch_quotes(tickers, batch_size: int, today):
+    """Today's bar so far for every ticker (ticker-indexed frame), stale sessions excluded."""
+    import pandas as pd
+
+    frame = download_batches(tickers, batch_size, period="1d", interval="1d")
+    if frame.empty:
+        return pd.DataFrame(columns=FIELDS)
+    frame = frame[frame.index.normalize() == today.strftime("%Y-%m-%d")]
+    if frame.empty:
+        return pd.DataFrame(columns=FIELDS)
+    last = frame.iloc[-1].unstack(level=-1)
+    return last.reindex(columns=FIELDS).dropna(subset=["Close"])
+
+
+def resolve_batch_date(today) -> str:
+    """
+    Date the morning batch wrote its rows under. The batch runs at 22:00 UTC and dates
+    the run in UTC, so during the session this is usually the previous JST day.
+    """
+    from services.snapshot import read_snapshot, ANALYSIS_DATE
+
+    today_str = today.strftime("%Y-%m-%d")
+    try:
+        pointer = read_snapshot(ANALYSIS_DATE, columns="date")
+        if pointer and pointer["date"] and str(pointer["date"])[:10] <= today_str:
+            return str(pointer["date"])[:10]
+        # Pointer not published yet: latest stored date
+        res = (
+            supabase.table("market_analysis_log")
+            .select("date")
+            .lte("date", today_str)
+            .order("date", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            return str(res.data[0]["date"])[:10]
+    except Exception as e:
+        print(f"!!! Could not resolve the batch date: {e}")
+    return today_str
+
+
+def load_notified(batch_date: str):
+    """Tickers already AGGRESSIVE in this batch (morning run or earlier cycles): never re-notified."""
+    try:
+        res = (
+            supabase.table("market_analysis_log")
+            .select("ticker")
+            .eq("date", batch_date)
+            .eq("signal", "AGGRESSIVE")
+            .execute()
+        )
+        return {r["ticker"] for r in res.data}
+    except Exception as e:
+        print(f"!!! Could not load today's AGGRESSIVE names: {e}")
+        return set()
+
+
+def load_day_rows(batch_date: str):
+    from batch_jobs.daily_analysis_all import ANALYSIS_COLUMNS
+
+    return fetch_all(lambda: (
+        supabase.table("market_analysis_log")
+        .select(", ".join(ANALYSIS_COLUMNS))
+        .eq("date", batch_date)
+        .order("ticker")
+    ))
+
+
+def refresh_sector_aggregates(batch_date: str, rows):
+    """Recount sector_daily_log for the re-scored day (SMA75 is not tracked intraday: keep the morning ratio)."""
+    from services.sector_stats import compute_sector_aggregates
+
+    res = supabase.table("sector_daily_log").select("sector, above_sma75_ratio").eq("date", batch_date).execute()
+    morning_ratio = {r["sector"]: r.get("above_sma75_ratio") for r in res.data}
+    records = compute_sector_aggregates(batch_date, rows, {})
+    for record in records:
+        record["above_sma75_ratio"] = morning_ratio.get(record["sector"])
+    supabase.table("sector_daily_log").upsert(records).execute()
+    return records
+
+
+async def run_cycle(state, tickers, notified, today, batch_date, args, ticker_sector_map, ticker_name_map):
+    """One quote refresh + re-evaluation; rows, snapshots and events stay under batch_date."""
+    import numpy as np
+    from app.models import AnalysisResult
+    from services.notifier import dispatcher
+    from services import snapshot_files
+    from services.snapshot import publish_analysis_snapshot
+    from batch_jobs.daily_analysis_all import calculate_exit_guideline
+
+    started = time.perf_counter()
+    now = now_jst()
+
+    quotes = fetch_quotes(tickers, args.batch_size, today)
+    fetched = time.perf_counter()
+    updated = state.update_trailing(quotes)
+
+    progress = session_progress(now)
+    volume_scale = 1.0 / max(progress, 0.1) if args.project_volume and progress < 1.0 else 1.0
+    triggered, metrics = state.evaluate(volume_scale)
+    new_idx = [i for i in np.flatnonzero(triggered) if state.tickers[i] not in notified]
+    print(f"    [{now:%H:%M:%S}] quotes {updated}/{len(tickers)} ({fetched - started:.1f}s), "
+          f"triggered {int(triggered.sum())}, new {len(new_idx)} ({time.perf_counter() - started:.2f}s total)")
+    if not new_idx:
+        return []
+
+    # Only re-score names the morning batch analyzed: the partial upsert keeps their
+    # macro_score / trend_strength / correlation columns, which this job cannot compute
+    day_rows = {r["ticker"]: r for r in load_day_rows(batch_date)}
+    skipped = [i for i in new_idx if state.tickers[i] not in day_rows]
+    if skipped:
+        print(f"    Skipping {len(skipped)} names without a morning row: "
+              f"{', '.join(state.tickers[i] for i in skipped[:10])}")
+        new_idx = [i for i in new_idx if state.tickers[i] in day_rows]
+    if not new_idx:
+        return []
+
+    records, results = [], []
+    for i in new_idx:
+        ticker = state.tickers[i]
+        close, atr = float(metrics["close"][i]), float(metrics["atr"][i])
+        records.append({
+            "date": batch_date,
+            "ticker": ticker,
+            "sector": ticker_sector_map.get(ticker, ""),
+            "name_en": ticker_name_map.get(ticker, ""),
+            "close_price": close,
+            "rsi_14": float(metrics["rsi"][i]),
+            "atr_14": atr,
+            "upside_ratio": float(metrics["upside"][i]),
+            "signal": "AGGRESSIVE",
+            "exit_guideline": calculate_exit_guideline(close, atr, float(metrics["sma5"][i]), None),
+            "reason": f"Intraday Vol Surge & Short-term Uptrend ({now:%H:%M})",
+            HASH_COLUMN: None,  # Row no longer matches the batch's hash: a rerun must rewrite it
+        })
+        results.append(AnalysisResult(
+            ticker=ticker,
+            current_price=close,
+            rsi=float(metrics["rsi"][i]),
+            atr=atr,
+            target_price=float(metrics["bb_upper"][i]),
+            upside_ratio=float(metrics["upside"][i]),
+            signal="AGGRESSIVE",
+            reason=records[-1]["reason"],
+            timestamp=now,
+        ))
+
+    # Partial-column upsert: keeps the morning batch's other columns for these rows
+    try:
+        supabase.table("market_analysis_log").upsert(records).execute()
+    except Exception as e:
+        print(f"!!! DB Error: {e}")
+        return []
+    notified.update(r["ticker"] for r in records)
+
+    # Same read paths as the morning batch: DB snapshot, static files (SNAPSHOT_DIR), sector counts
+    for record in records:
+        day_rows[record["ticker"]].update({k: v for k, v in record.items() if k != HASH_COLUMN})
+    rows = list(day_rows.values())
+    try:
+        publish_analysis_snapshot(batch_date, rows)
+    except Exception as e:
+        print(f"!!! Snapshot Error: {e}")
+    try:
+        snapshot_files.write_analysis_snapshot(batch_date, rows)
+    except Exception as e:
+        print(f"!!! Snapshot File Error: {e}")
+    try:
+        refresh_sector_aggregates(batch_date, rows)
+    except Exception as e:
+        print(f"!!! Sector Aggregate Error: {e}")
+    publish_analysis_update(batch_date, kind="intraday", details={"tickers": [r["ticker"] for r in records]})
+
+    if not args.no_notify:
+        await dispatcher.dispatch(results)
+    return records
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Intraday AGGRESSIVE re-scoring")
+    parser.add_argument("--interval", type=float, default=config.INTRADAY_INTERVAL, help="Seconds between cycles")
+    parser.add_argument("--batch-size", type=int, default=config.INTRADAY_BATCH_SIZE, help="Tickers per quote request")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle (ignores market hours)")
+    parser.add_argument("--no-notify", action="store_true", help="Upsert only, skip Discord")
+    parser.add_argument("--no-project-volume", dest="project_volume", action="store_false",
+                        help="Compare raw partial-day volume against Vol_SMA5")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from services.notifier import dispatcher
+
+    today = now_jst()
+    batch_date = resolve_batch_date(today)
+    print(f"🚀 Intraday Re-scoring Start: {today:%Y-%m-%d} (batch date {batch_date})")
+
+    tickers_df = pd.read_csv("batch_jobs/data/prime_tickers.csv")
+    tickers = tickers_df["ticker"].tolist()
+    ticker_sector_map = dict(zip(tickers_df["ticker"], tickers_df["sector"]))
+    ticker_name_map = dict(zip(tickers_df["ticker"], tickers_df["name"]))
+
+    print(f">>> Loading {HISTORY_BARS} daily bars for {len(tickers)} tickers...")
+    state = IndicatorState(tickers)
+    history = download_batches(tickers, args.batch_size, start=(today - timedelta(days=60)).strftime("%Y-%m-%d"))
+    if history.empty:
+        print("!!! No history downloaded. Aborting.")
+        return
+    state.load_history(history, today)
+    notified = load_notified(batch_date)
+    print(f"    {len(notified)} names already AGGRESSIVE in the {batch_date} batch.")
+
+    try:
+        while True:
+            now = now_jst()
+            if not args.once and not market_open(now):
+                if session_progress(now) >= 1.0 or now.weekday() >= 5:
+                    print(">>> Market closed. Exiting.")
+                    break
+                await asyncio.sleep(min(args.interval, 60))
+                continue
+
+            started = time.monotonic()
+            try:
+                await run_cycle(state, tickers, notified, today, batch_date, args, ticker_sector_map, ticker_name_map)
+            except Exception as e:
+                print(f"!!! Cycle Error: {e}")
+            if args.once:
+                break
+            await asyncio.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    finally:
+        await dispatcher.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+Cold-start / import-time benchmark.
+
+Runs each entry point in a fresh interpreter with `python -X importtime`, sums
+the cumulative import time of the top-level modules and lists the heaviest
+ones, plus the wall time of `daily_analysis_all.py --help`.
+
+    PYTHONPATH=. python benchmarks/import_time.py
+    PYTHONPATH=. python benchmarks/import_time.py --update-baseline
+
+Results are compared with benchmarks/import_baseline.json; the run exits
+non-zero when a target's import time grows beyond --tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "import_baseline.json")
+
+# name -> statement executed in a fresh interpreter
+IMPORT_TARGETS = {
+    "app.main": "import app.main",
+    "services.macro": "import services.macro",
+    "services.db_client": "import services.db_client",
+}
+HELP_COMMAND = [os.path.join("batch_jobs", "daily_analysis_all.py"), "--help"]
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT_DIR, env.get("PYTHONPATH")) if p)
+    # No network / credentials needed: clients are created on first use
+    env.setdefault("DB_BACKEND", "sqlite")
+    env.setdefault("SQLITE_PATH", ":memory:")
+    return env
+
+
+def parse_importtime(stderr: str):
+    """
+    `-X importtime` lines: "import time: self [us] | cumulative | imported package".
+    Returns (total cumulative us of top-level imports, {module: cumulative us}).
+    """
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue  # header line
+        raw_name = parts[2].rstrip()[1:]  # drop the separator space; the rest is 2 spaces per level
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+        if depth == 0:
+            # Top-level import of the executed statement (nested ones are already included)
+            total += cumulative
+        top = name.split(".")[0]
+        modules[top] = max(modules.get(top, 0), cumulative)
+    return total, modules
+
+
+def measure_import(statement: str):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR, env=_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    return parse_importtime(proc.stderr)
+
+
+def measure_help():
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable] + HELP_COMMAND, cwd=ROOT_DIR, env=_env(), capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "--help failed")
+    return elapsed
+
+
+def run(repeat: int, top: int):
+    results = {}
+    for name, statement in IMPORT_TARGETS.items():
+        totals, heaviest = [], {}
+        try:
+            for _ in range(repeat):
+                total, modules = measure_import(statement)
+                totals.append(total)
+                heaviest = modules
+        except RuntimeError as e:
+            print(f"  {name:<20} skipped ({e})")
+            continue
+        ms = statistics.median(totals) / 1000
+        results[name] = {"import_ms": round(ms, 1)}
+        print(f"  {name:<20} {ms:>8.1f}ms")
+        for module, us in sorted(heaviest.items(), key=lambda kv: kv[1], reverse=True)[:top]:
+            print(f"      {module:<28} {us / 1000:>8.1f}ms")
+
+    try:
+        wall = statistics.median(measure_help() for _ in range(repeat)) * 1000
+        results["batch_help"] = {"import_ms": round(wall, 1)}
+        print(f"  {'batch --help (wall)':<20} {wall:>8.1f}ms")
+    except RuntimeError as e:
+        print(f"  batch --help skipped ({e})")
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance: float):
+    failures = []
+    for name, base in baseline.get("targets", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["import_ms"] > base["import_ms"] * (1 + tolerance):
+            failures.append(f"{name}: {cur['import_ms']}ms > baseline {base['import_ms']}ms (+{tolerance:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time / cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target (median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest modules listed per target")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed regression vs baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run as the new baseline")
+    args = parser.parse_args()
+
+    print(f">>> Import time (median of {args.repeat})")
+    results = run(args.repeat, args.top)
+    report = {"python": sys.version.split()[0], "targets": results}
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f">>> Baseline saved: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = compare_with_baseline(results, baseline, args.tolerance)
+    if failures:
+        print("!!! Regressions vs baseline:")
+        for line in failures:
+            print(f"    - {line}")
+        return 1
+    print(">>> No regressions vs baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
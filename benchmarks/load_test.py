@@ -0,0 +1,255 @@
+"""
+Offline API load test.
+
+Boots the FastAPI app in-process (httpx ASGI transport) against a seeded local
+SQLite store (Prime universe x N days), drives the read endpoints at a fixed
+concurrency and reports requests/sec and p50/p95/p99 latency per scenario.
+
+    PYTHONPATH=. python benchmarks/load_test.py --days 60 --concurrency 32
+    PYTHONPATH=. python benchmarks/load_test.py --update-baseline
+
+Results are compared with benchmarks/baseline.json; the run exits non-zero when
+a scenario's throughput drops or its p95 latency grows beyond --tolerance.
+The numbers are machine-specific: the baseline records its host and the
+comparison is skipped on a different platform / Python / CPU count.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+TICKERS_CSV = os.path.join(os.path.dirname(BENCH_DIR), "batch_jobs", "data", "prime_tickers.csv")
+
+SIGNALS = ["WAIT"] * 18 + ["BUY", "AGGRESSIVE"]
+
+
+def configure_environment(workdir: str):
+    """Must run before importing app / services (they read the env at import)."""
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["ANALYSIS_SIGNAL_PATH"] = os.path.join(workdir, "analysis_updated.json")
+    os.environ.setdefault("SNAPSHOT_DIR", "")
+
+
+def load_universe(limit: int):
+    with open(TICKERS_CSV, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return [(r["ticker"], r["sector"], r["name"]) for r in rows[:limit]]
+
+
+def trading_days(end: date, count: int):
+    days = []
+    d = end
+    while len(days) < count:
+        if d.weekday() < 5:
+            days.append(d.isoformat())
+        d -= timedelta(days=1)
+    return sorted(days)
+
+
+def seed_store(n_tickers: int, n_days: int, seed: int = 42):
+    """Realistic-size dataset: every ticker on every trading day, long text on signals."""
+    from services.db_client import supabase
+    from services.snapshot import publish_analysis_snapshot, publish_snapshot, MACRO
+
+    rng = random.Random(seed)
+    universe = load_universe(n_tickers)
+    days = trading_days(date.today(), n_days)
+
+    rows = []
+    for day in days:
+        day_rows = []
+        for ticker, sector, name in universe:
+            signal = rng.choice(SIGNALS)
+            day_rows.append({
+                "date": day,
+                "ticker": ticker,
+                "sector": sector,
+                "name_jp": None,
+                "name_en": name,
+                "close_price": round(rng.uniform(300, 15000), 1),
+                "rsi_14": round(rng.uniform(15, 85), 2),
+                "atr_14": round(rng.uniform(5, 300), 2),
+                "upside_ratio": round(rng.uniform(-1, 6), 3),
+                "macro_score": rng.randint(-5, 5),
+                "signal": signal,
+                "trend_strength": rng.choice("SABC"),
+                "correlation_us": round(rng.uniform(-0.5, 0.95), 3),
+                "exit_guideline": "STOP:1234 | TRAIL:SMA5(1300)" if signal == "AGGRESSIVE" else "",
+                "performance_summary": ("増収増益基調。" * 20) if signal != "WAIT" else None,
+                "earnings_release_date": None,
+                "reason": "Vol Surge & Short-term Uptrend" if signal == "AGGRESSIVE" else None,
+            })
+        for i in range(0, len(day_rows), 500):
+            supabase.table("market_analysis_log").upsert(day_rows[i:i + 500]).execute()
+        rows = day_rows
+
+        macro = {
+            "date": day,
+            "summary": "ベンチマーク用データ",
+            "sector_scores": {"全体": rng.randint(-3, 3)},
+            "risk_events": [],
+            "usd_jpy": 150.0,
+            "sox_index": 200.0,
+            "nasdaq_index": 18000.0,
+        }
+        supabase.table("daily_macro_log").upsert(macro).execute()
+
+    publish_analysis_snapshot(days[-1], rows)
+    publish_snapshot(MACRO, days[-1], macro)
+    return [t for t, _, _ in universe], days
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def run_scenario(client, name: str, make_path, total: int, concurrency: int):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            path = make_path(i)
+            started = time.perf_counter()
+            res = await client.get(path, headers={"Accept-Encoding": "gzip"})
+            latencies.append(time.perf_counter() - started)
+            if res.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_load(tickers, requests: int, concurrency: int):
+    import httpx
+    from app.main import app
+
+    scenarios = {
+        "latest_all": lambda i: "/api/latest?mode=all",
+        "latest_recommend": lambda i: "/api/latest?mode=recommend",
+        "recommendations": lambda i: "/api/recommendations",
+        "history_ticker": lambda i: f"/api/history/{tickers[i % len(tickers)]}",
+        "macro_latest": lambda i: "/api/macro/latest",
+    }
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_path in scenarios.items():
+            # Warm-up (first request per date fills the response cache)
+            await client.get(make_path(0))
+            results[name] = await run_scenario(client, name, make_path, requests, concurrency)
+            r = results[name]
+            print(f"  {name:<18} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}ms  "
+                  f"p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}")
+    return results
+
+
+def host_info():
+    """What absolute req/s and latency depend on; a baseline only applies to the same host."""
+    return {
+        "platform": f"{platform.system()}-{platform.machine()}",
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance: float):
+    failures = []
+    for name, base in baseline.get("scenarios", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if cur["errors"]:
+            failures.append(f"{name}: {cur['errors']} errors")
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            failures.append(f"{name}: throughput {cur['rps']} < baseline {base['rps']} (-{tolerance:.0%})")
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p95 {cur['p95_ms']}ms > baseline {base['p95_ms']}ms (+{tolerance:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API load test")
+    parser.add_argument("--tickers", type=int, default=1600, help="Universe size (from prime_tickers.csv)")
+    parser.add_argument("--days", type=int, default=30, help="Trading days of history to seed")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression vs baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run as the new baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        configure_environment(workdir)
+
+        print(f">>> Seeding {args.tickers} tickers x {args.days} days...")
+        started = time.perf_counter()
+        tickers, days = seed_store(args.tickers, args.days)
+        print(f"    Seeded in {time.perf_counter() - started:.1f}s (latest date {days[-1]}).")
+
+        print(f">>> Load: {args.requests} requests/scenario, concurrency {args.concurrency}")
+        results = asyncio.run(run_load(tickers, args.requests, args.concurrency))
+
+    report = {
+        "params": {k: getattr(args, k) for k in ("tickers", "days", "requests", "concurrency")},
+        "host": host_info(),
+        "scenarios": results,
+    }
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f">>> Baseline saved: {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("host") != report["host"]:
+        print(f"!!! Baseline was recorded on another host ({baseline.get('host') or 'unknown'}; "
+              f"this one is {report['host']}). Skipping the comparison: throughput and latency "
+              f"are not comparable across machines. Record a local baseline with --update-baseline.")
+        return 0
+    if baseline.get("params") != report["params"]:
+        print("!!! Baseline was recorded with different params; comparison may be meaningless.")
+    failures = compare_with_baseline(results, baseline, args.tolerance)
+    if failures:
+        print("!!! Regressions vs baseline:")
+        for line in failures:
+            print(f"    - {line}")
+        return 1
+    print(">>> No regressions vs baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Local mock of a Discord webhook for exercising services/notifier offline.
+
+The ASGI app validates each message against Discord's limits (10 embeds,
+6,000 embed characters, 2,000 content characters; 400 otherwise) and applies a
+per-webhook bucket (--bucket-size requests per --bucket-window seconds) that
+answers 429 with `retry_after` once exhausted, like the real API.
+
+    PYTHONPATH=. python benchmarks/mock_discord.py --results 100
+    PYTHONPATH=. python benchmarks/mock_discord.py --results 20 --digest-threshold 1000
+
+The run reports messages / requests / 429s and exits non-zero if any message
+was rejected or lost.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WEBHOOK_URL = "http://discord.mock/api/webhooks/0/token"
+
+
+class MockWebhook:
+    """ASGI app; `messages` keeps every accepted payload in arrival order."""
+
+    def __init__(self, bucket_size: int = 5, bucket_window: float = 2.0, bucket_id: str = "mock-bucket"):
+        self.bucket_size = bucket_size
+        self.bucket_window = bucket_window
+        self.bucket_id = bucket_id
+        self.messages = []
+        self.requests = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self._window_start = time.monotonic()
+        self._used = 0
+
+    def _validate(self, payload) -> str:
+        embeds = payload.get("embeds") or []
+        if not embeds and not payload.get("content"):
+            return "Cannot send an empty message"
+        if len(embeds) > 10:
+            return "embeds: Must be 10 or fewer in length."
+        if len(payload.get("content") or "") > 2000:
+            return "content: Must be 2000 or fewer in length."
+        total = 0
+        for embed in embeds:
+            if len(embed.get("title") or "") > 256 or len(embed.get("description") or "") > 4096:
+                return "embeds: field too long"
+            total += len(embed.get("title") or "") + len(embed.get("description") or "")
+            total += len((embed.get("footer") or {}).get("text") or "")
+            total += len((embed.get("author") or {}).get("name") or "")
+            for field in embed.get("fields") or []:
+                total += len(field.get("name") or "") + len(field.get("value") or "")
+        if total > 6000:
+            return "Embed size exceeds maximum size of 6000"
+        return ""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            event = await receive()
+            body += event.get("body", b"")
+            if not event.get("more_body"):
+                break
+        self.requests += 1
+
+        now = time.monotonic()
+        if now - self._window_start >= self.bucket_window:
+            self._window_start, self._used = now, 0
+        reset_after = max(0.0, self.bucket_window - (now - self._window_start))
+
+        if self._used >= self.bucket_size:
+            self.rate_limited += 1
+            status, content = 429, {"message": "You are being rate limited.", "retry_after": round(reset_after, 3),
+                                    "global": False}
+            remaining = 0
+        else:
+            self._used += 1
+            remaining = self.bucket_size - self._used
+            try:
+                payload = json.loads(body or b"{}")
+                error = self._validate(payload)
+            except ValueError:
+                error = "Invalid JSON"
+            if error:
+                self.rejected += 1
+                status, content = 400, {"message": error, "code": 50035}
+            else:
+                self.messages.append(payload)
+                status, content = 204, None
+
+        headers = [
+            (b"x-ratelimit-limit", str(self.bucket_size).encode()),
+            (b"x-ratelimit-remaining", str(remaining).encode()),
+            (b"x-ratelimit-reset-after", f"{reset_after:.3f}".encode()),
+            (b"x-ratelimit-bucket", self.bucket_id.encode()),
+        ]
+        data = b""
+        if content is not None:
+            data = json.dumps(content).encode("utf-8")
+            headers.append((b"content-type", b"application/json"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": data})
+
+
+def make_results(count: int, seed: int = 7):
+    from app.models import AnalysisResult
+
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        price = rng.uniform(300, 15000)
+        results.append(AnalysisResult(
+            ticker=f"{1300 + i}.T",
+            current_price=price,
+            rsi=rng.uniform(15, 85),
+            atr=price * 0.02,
+            target_price=price * 1.05,
+            upside_ratio=rng.uniform(0, 5),
+            signal=rng.choice(["BUY", "BUY", "SELL"]),
+            reason="Vol Surge & Short-term Uptrend. " * rng.randint(1, 20),
+            timestamp=datetime.now(),
+        ))
+    return results
+
+
+async def run(args):
+    import httpx
+    from app.config import config
+    from services.notifier import DiscordDispatcher
+
+    config.DISCORD_DIGEST_THRESHOLD = args.digest_threshold
+    mock = MockWebhook(args.bucket_size, args.bucket_window)
+    dispatcher = DiscordDispatcher(WEBHOOK_URL, transport=httpx.ASGITransport(app=mock))
+    results = make_results(args.results)
+    macro = {"reason_summary": "米金利低下で半導体に追い風。", "全体": 1, "半導体": 2}
+
+    started = time.perf_counter()
+    try:
+        stats = await dispatcher.dispatch(results, macro)
+    finally:
+        await dispatcher.aclose()
+    elapsed = time.perf_counter() - started
+
+    delivered = sum(len(m.get("embeds") or []) for m in mock.messages)
+    print(f"  results {len(results)}  messages {stats['messages']}  requests {stats['requests']}  "
+          f"429s {stats['rate_limited']}  rejected {mock.rejected}  embeds {delivered}  {elapsed:.2f}s")
+    return 1 if stats["failed"] or mock.rejected else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatch fake results to a local mock Discord webhook")
+    parser.add_argument("--results", type=int, default=100)
+    parser.add_argument("--digest-threshold", type=int, default=30)
+    parser.add_argument("--bucket-size", type=int, default=5, help="Requests allowed per window")
+    parser.add_argument("--bucket-window", type=float, default=2.0, help="Seconds")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Process fan-out benchmark: pickled per-ticker DataFrames vs the shared OHLCV panel.
+
+Builds a synthetic universe (--tickers x --days of daily bars) and runs the same
+worker (RSI(14) of each ticker plus its return correlation with the first ticker)
+on a process pool two ways:
+
+  pickled   each task carries its ticker's DataFrame plus the reference series
+  panel     workers attach to services/ohlcv_panel.py once; tasks are ticker names
+
+and reports wall time and bytes pickled per task. The panel is one block mapped by
+every worker, so its size is paid once regardless of --processes.
+
+    PYTHONPATH=. python benchmarks/panel_fanout.py
+    PYTHONPATH=. python benchmarks/panel_fanout.py --tickers 3200 --days 1000 --processes 8
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from services import ohlcv_panel
+
+
+def _rsi(close: np.ndarray, period: int = 14) -> float:
+    delta = np.diff(close[~np.isnan(close)])[-period:]
+    gain, loss = delta[delta > 0].sum(), -delta[delta < 0].sum()
+    return 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+
+
+def _corr(close: np.ndarray, reference: np.ndarray) -> float:
+    a, b = np.diff(np.log(close)), np.diff(np.log(reference))
+    mask = ~(np.isnan(a) | np.isnan(b))
+    return float(np.corrcoef(a[mask], b[mask])[0, 1]) if mask.sum() > 2 else float("nan")
+
+
+def pickled_worker(task):
+    ticker, df, reference = task
+    close = df["Close"].to_numpy()
+    return ticker, _rsi(close), _corr(close, reference)
+
+
+def panel_worker(panel, ticker):
+    close = panel.series(ticker)
+    reference = panel.field("close")[:, 0]
+    return ticker, _rsi(close), _corr(close, reference)
+
+
+def synthetic_frames(tickers: int, days: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=days)
+    frames = {}
+    for i in range(tickers):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        frames[f"{1000 + i}.T"] = pd.DataFrame({
+            "Open": close * 0.995, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, days).astype(float),
+        }, index=index)
+    return frames
+
+
+def run_pickled(frames, processes: int, chunksize: int):
+    from concurrent.futures import ProcessPoolExecutor
+
+    reference = frames[min(frames)]["Close"].to_numpy()
+    tasks = [(t, df, reference) for t, df in sorted(frames.items())]
+    task_bytes = sum(len(pickle.dumps(task)) for task in tasks) / len(tasks)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(pickled_worker, tasks, chunksize=chunksize))
+    return time.perf_counter() - started, task_bytes, results
+
+
+def run_panel(frames, processes: int):
+    started = time.perf_counter()
+    with ohlcv_panel.from_frames(frames) as panel:
+        built = time.perf_counter() - started
+        tasks = list(panel.tickers)
+        # The handle goes to each worker once (pool initializer); tasks carry the function and a ticker
+        task_bytes = (processes * len(pickle.dumps(panel.handle))
+                      + sum(len(pickle.dumps((panel_worker, t))) for t in tasks)) / len(tasks)
+        results = ohlcv_panel.map_panel(panel_worker, panel, tasks, processes)
+        return time.perf_counter() - started, built, task_bytes, panel.nbytes(), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pickled DataFrame vs shared-panel process fan-out")
+    parser.add_argument("--tickers", type=int, default=1600)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--chunksize", type=int, default=1, help="pool.map chunksize for the pickled run")
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.tickers, args.days)
+    print(f">>> {args.tickers} tickers x {args.days} days, {args.processes} processes")
+
+    elapsed, task_bytes, pickled = run_pickled(frames, args.processes, args.chunksize)
+    print(f"    pickled  {elapsed:6.2f}s | {task_bytes / 1024:8.1f} KB pickled per task")
+
+    elapsed, built, task_bytes, nbytes, shared = run_panel(frames, args.processes)
+    print(f"    panel    {elapsed:6.2f}s | {task_bytes / 1024:8.1f} KB pickled per task | "
+          f"panel {nbytes / 1024 / 1024:.1f} MB (built in {built:.2f}s)")
+
+    mismatches = sum(
+        1 for a, b in zip(sorted(pickled), sorted(shared))
+        if not (np.isclose(a[1], b[1]) and np.isclose(a[2], b[2], equal_nan=True))
+    )
+    print(f"    results identical: {'yes' if mismatches == 0 else f'no ({mismatches} tickers differ)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import datetime
+import decimal
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from services import archive
+
+# Embedded analytical queries (DuckDB) over the local Parquet archive (services/archive.py).
+# Views:
+#   analysis   market_analysis_log rows (daily files override compacted rows of the same date)
+#   ohlcv      daily bars (date, ticker, open, high, low, close, volume)
+# Every query is a fixed SQL text from QUERIES with DuckDB named parameters ($name);
+# callers only supply parameter values, validated against the query's spec.
+# Windows are relative to the latest archived analysis date (end_date).
+
+SIGNALS = ["AGGRESSIVE", "BUY", "WAIT"]
+_BOUNDS = "bounds AS (SELECT max(date) AS end_date FROM analysis)"
+_SECTOR_FILTER = "(CAST($sector AS VARCHAR) IS NULL OR sector = $sector)"
+
+QUERIES: Dict[str, Dict[str, Any]] = {
+    "signal_counts": {
+        "description": "Signals per sector and signal type over the last `days` days.",
+        "params": {
+            "days": {"type": int, "default": 90, "min": 1, "max": 730},
+            "sector": {"type": str, "default": None},
+        },
+        "sql": f"""
+            WITH {_BOUNDS}
+            SELECT sector, signal, count(*) AS signals, count(DISTINCT ticker) AS tickers
+            FROM analysis, bounds
+            WHERE date > end_date - $days AND {_SECTOR_FILTER}
+            GROUP BY sector, signal
+            ORDER BY sector, signals DESC
+        """,
+    },
+    "rsi_distribution": {
+        "description": "RSI(14) histogram per sector over the last `days` days (bucket width `bucket`).",
+        "params": {
+            "days": {"type": int, "default": 90, "min": 1, "max": 730},
+            "bucket": {"type": int, "default": 10, "min": 1, "max": 50},
+            "sector": {"type": str, "default": None},
+        },
+        "sql": f"""
+            WITH {_BOUNDS},
+            rows AS (
+                SELECT sector, CAST(floor(rsi_14 / $bucket) * $bucket AS INTEGER) AS bucket_from
+                FROM analysis, bounds
+                WHERE date > end_date - $days AND rsi_14 IS NOT NULL AND {_SECTOR_FILTER}
+            )
+            SELECT sector, bucket_from, bucket_from + $bucket AS bucket_to, count(*) AS rows,
+                   round(count(*) / sum(count(*)) OVER (PARTITION BY sector), 4) AS share
+            FROM rows
+            GROUP BY sector, bucket_from
+            ORDER BY sector, bucket_from
+        """,
+    },
+    "stop_hits": {
+        "description": (
+            "How often `signal` rows hit their `atr_mult` x ATR stop (close - atr_mult * atr_14) "
+            "on a daily low within `horizon` trading days, per sector. Needs the OHLCV archive; "
+            "`incomplete` counts signals with fewer than `horizon` bars archived so far."
+        ),
+        "params": {
+            "days": {"type": int, "default": 180, "min": 1, "max": 730},
+            "signal": {"type": str, "default": "AGGRESSIVE", "choices": SIGNALS},
+            "sector": {"type": str, "default": None},
+            "atr_mult": {"type": float, "default": 2.0, "min": 0.5, "max": 5.0},
+            "horizon": {"type": int, "default": 10, "min": 1, "max": 60},
+        },
+        "sql": f"""
+            WITH {_BOUNDS},
+            entries AS (
+                SELECT date, ticker, sector, close_price AS entry, close_price - $atr_mult * atr_14 AS stop
+                FROM analysis, bounds
+                WHERE date > end_date - $days AND signal = $signal AND atr_14 > 0 AND {_SECTOR_FILTER}
+            ),
+            forward AS (
+                SELECT e.date, e.ticker, e.sector, e.entry, e.stop, o.low, o.close,
+                       row_number() OVER (PARTITION BY e.ticker, e.date ORDER BY o.date) AS day_n
+                FROM entries e
+                JOIN ohlcv o ON o.ticker = e.ticker AND o.date > e.date AND o.date <= e.date + ($horizon * 2 + 7)
+            ),
+            per_signal AS (
+                SELECT sector, entry, count(*) AS bars,
+                       min(CASE WHEN low <= stop THEN day_n END) AS stop_day,
+                       arg_max(close, day_n) AS last_close
+                FROM forward
+                WHERE day_n <= $horizon
+                GROUP BY date, ticker, sector, entry
+            )
+            SELECT sector, count(*) AS signals, count(stop_day) AS stop_hits,
+                   round(count(stop_day) / count(*), 4) AS hit_rate,
+                   round(avg(stop_day), 2) AS avg_days_to_stop,
+                   round(avg(last_close / entry - 1), 4) AS avg_return,
+                   count(*) FILTER (WHERE bars < $horizon) AS incomplete
+            FROM per_signal
+            GROUP BY sector
+            ORDER BY signals DESC, sector
+        """,
+    },
+    "forward_returns": {
+        "description": "Close-to-close return `horizon` trading days after each signal, per signal type.",
+        "params": {
+            "days": {"type": int, "default": 180, "min": 1, "max": 730},
+            "sector": {"type": str, "default": None},
+            "horizon": {"type": int, "default": 5, "min": 1, "max": 60},
+        },
+        "sql": f"""
+            WITH {_BOUNDS},
+            entries AS (
+                SELECT date, ticker, signal, close_price
+                FROM analysis, bounds
+                WHERE date > end_date - $days AND close_price > 0 AND {_SECTOR_FILTER}
+            ),
+            forward AS (
+                SELECT e.signal, e.close_price, o.close,
+                       row_number() OVER (PARTITION BY e.ticker, e.date ORDER BY o.date) AS day_n
+                FROM entries e
+                JOIN ohlcv o ON o.ticker = e.ticker AND o.date > e.date AND o.date <= e.date + ($horizon * 2 + 7)
+            )
+            SELECT signal, count(*) AS samples,
+                   round(avg(close / close_price - 1), 4) AS avg_return,
+                   round(median(close / close_price - 1), 4) AS median_return,
+                   round(avg(CASE WHEN close > close_price THEN 1 ELSE 0 END), 4) AS win_rate
+            FROM forward
+            WHERE day_n = $horizon
+            GROUP BY signal
+            ORDER BY signal
+        """,
+    },
+}
+
+
+def describe() -> List[Dict[str, Any]]:
+    """Query library for clients: name, description and parameter specs."""
+    out = []
+    for name, query in QUERIES.items():
+        params = {}
+        for key, spec in query["params"].items():
+            params[key] = {k: (v.__name__ if k == "type" else v) for k, v in spec.items()}
+        out.append({"name": name, "description": query["description"], "params": params})
+    return out
+
+
+def validate(name: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Coerce and check parameter values (strings from a query string are fine).
+    Raises KeyError for an unknown query, ValueError for bad parameters.
+    """
+    specs = QUERIES[name]["params"]
+    unknown = [k for k in values if k not in specs]
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    params = {}
+    for key, spec in specs.items():
+        value = values.get(key)
+        if value is None or value == "":
+            params[key] = spec["default"]
+            continue
+        try:
+            value = spec["type"](value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key}: expected {spec['type'].__name__}")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"{key}: expected a finite number")
+        if "min" in spec and value < spec["min"] or "max" in spec and value > spec["max"]:
+            raise ValueError(f"{key}: must be between {spec['min']} and {spec['max']}")
+        if spec.get("choices") and value not in spec["choices"]:
+            raise ValueError(f"{key}: must be one of {', '.join(spec['choices'])}")
+        params[key] = value
+    return params
+
+
+def _plain(value: Any) -> Any:
+    """JSON-safe scalar (dates as ISO strings, no NaN / Decimal)."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        value = float(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _view_sql(table: str, base_dir: str = None) -> Optional[str]:
+    found = archive.files(base_dir, table)
+    selects = []
+    if found["daily"]:
+        paths = ", ".join(_quote(p) for p in found["daily"])
+        selects.append(f"SELECT * FROM read_parquet([{paths}], union_by_name = true)")
+    if found["compacted"]:
+        paths = ", ".join(_quote(p) for p in found["compacted"])
+        superseded = ""
+        if found["daily_dates"]:
+            dates = ", ".join(f"DATE {_quote(d)}" for d in found["daily_dates"])
+            superseded = f" WHERE date NOT IN ({dates})"
+        selects.append(f"SELECT * FROM read_parquet([{paths}], union_by_name = true){superseded}")
+    return " UNION ALL BY NAME ".join(selects) or None
+
+
+def _empty_table(table: str):
+    import pyarrow as pa
+
+    arrow_schema = archive.schema(table)
+    fields = [pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in arrow_schema]
+    return pa.schema(fields).empty_table()
+
+
+class AnalyticsEngine:
+    """
+    In-memory DuckDB connection with views over the archive files.
+    The views are rebuilt when the archive changes (archive.signature); each query runs
+    on its own cursor, so concurrent API requests do not share connection state.
+    """
+
+    def __init__(self, base_dir: str = None):
+        self.base_dir = base_dir
+        self._con = None
+        self._signature: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def signature(self) -> str:
+        return archive.signature(self.base_dir)
+
+    def _connect(self, signature: str):
+        import duckdb
+
+        con = duckdb.connect(":memory:")
+        for view, table in (("analysis", archive.TABLE), ("ohlcv", archive.OHLCV)):
+            sql = _view_sql(table, self.base_dir)
+            if sql is None:
+                con.register(f"empty_{view}", _empty_table(table))
+                sql = f"SELECT * FROM empty_{view}"
+            con.execute(f"CREATE VIEW {view} AS {sql}")
+        self._con = con
+        self._signature = signature
+
+    def cursor(self):
+        signature = self.signature()
+        with self._lock:
+            if self._con is None or signature != self._signature:
+                # In-flight cursors keep the previous connection alive until they finish
+                self._connect(signature)
+            return self._con.cursor(), signature
+
+    def run(self, name: str, values: Dict[str, Any] = None) -> Dict[str, Any]:
+        params = validate(name, values or {})
+        sql = QUERIES[name]["sql"]
+        # Only pass the parameters the statement references (DuckDB rejects extras)
+        bound = {k: v for k, v in params.items() if f"${k}" in sql}
+        cur, signature = self.cursor()
+        started = time.perf_counter()
+        try:
+            cur.execute(sql, bound)
+            columns = [d[0] for d in cur.description]
+            rows = [{c: _plain(v) for c, v in zip(columns, row)} for row in cur.fetchall()]
+        finally:
+            cur.close()
+        return {
+            "query": name,
+            "params": params,
+            "columns": columns,
+            "rows": rows,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "archive_signature": signature,
+        }
+
+
+# Shared engine over config.ARCHIVE_DIR, or archive.DEFAULT_DIR when unset (API and CLI)
+engine = AnalyticsEngine()
+
+
+def run(name: str, values: Dict[str, Any] = None, base_dir: str = None) -> Dict[str, Any]:
+    return (engine if base_dir is None else AnalyticsEngine(base_dir)).run(name, values)
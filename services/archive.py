@@ -0,0 +1,252 @@
+import hashlib
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import config
+from services.sqlite_client import TABLE_SCHEMAS
+
+# Columnar archive for local multi-day analytics (market_analysis_log + daily OHLCV bars):
+#   <ARCHIVE_DIR>/<table>/month=YYYY-MM/YYYY-MM-DD.parquet   one file per day (batch appends)
+#   <ARCHIVE_DIR>/<table>/month=YYYY-MM/compacted.parquet    whole month (compaction)
+# A daily file wins over the compacted file for its date (reruns after compaction).
+TABLE = "market_analysis_log"
+OHLCV = "ohlcv"
+DICTIONARY_COLUMNS = ["ticker", "sector", "signal", "trend_strength"]
+EXCLUDED_COLUMNS = ["content_hash"]
+COMPACTED_FILE = "compacted.parquet"
+# Read / maintenance root when ARCHIVE_DIR is unset (batch writes stay disabled)
+DEFAULT_DIR = "data/archive"
+
+# Daily bars (split/dividend adjusted, as downloaded by the batch with auto_adjust=True)
+OHLCV_COLUMNS = {
+    "date": "DATE", "ticker": "TEXT",
+    "open": "REAL", "high": "REAL", "low": "REAL", "close": "REAL", "volume": "BIGINT",
+}
+
+
+def enabled() -> bool:
+    return bool(config.ARCHIVE_DIR)
+
+
+def table_dir(base_dir: str = None, table: str = TABLE) -> str:
+    return os.path.join(base_dir or config.ARCHIVE_DIR or DEFAULT_DIR, table)
+
+
+def _column_types(table: str = TABLE) -> Dict[str, str]:
+    return OHLCV_COLUMNS if table == OHLCV else TABLE_SCHEMAS[table]["columns"]
+
+
+def columns(table: str = TABLE) -> List[str]:
+    return [c for c in _column_types(table) if c not in EXCLUDED_COLUMNS]
+
+
+def schema(table: str = TABLE):
+    import pyarrow as pa
+
+    types = {"TEXT": pa.string(), "REAL": pa.float64(), "INTEGER": pa.int32(), "BIGINT": pa.int64()}
+    fields = []
+    for name in columns(table):
+        if name == "date":
+            fields.append(pa.field(name, pa.date32()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, types[_column_types(table)[name]]))
+    return pa.schema(fields)
+
+
+def _to_table(rows: List[Dict[str, Any]], table: str = TABLE):
+    import pyarrow as pa
+
+    arrow_schema = schema(table)
+    data = {}
+    for field in arrow_schema:
+        values = [r.get(field.name) for r in rows]
+        if field.name == "date":
+            values = [v if isinstance(v, date) or v is None else date.fromisoformat(str(v)[:10]) for v in values]
+            data[field.name] = pa.array(values, type=pa.date32())
+        elif pa.types.is_dictionary(field.type):
+            data[field.name] = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            data[field.name] = pa.array(values, type=field.type)
+    return pa.table(data, schema=arrow_schema)
+
+
+def _write_table(table, path: str):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    # Sorted by (date, ticker): row-group statistics then prune date ranges well
+    keys = pa.table({"date": table["date"], "ticker": table["ticker"].cast(pa.string())})
+    order = pc.sort_indices(keys, sort_keys=[("date", "ascending"), ("ticker", "ascending")])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(
+        table.take(order),
+        tmp_path,
+        compression="zstd",
+        use_dictionary=DICTIONARY_COLUMNS,
+    )
+    os.replace(tmp_path, path)
+
+
+def append_day(target_date: str, rows: List[Dict[str, Any]], base_dir: str = None, table: str = TABLE) -> Optional[str]:
+    """Write (or replace) the file of one analysis date."""
+    if not (base_dir or enabled()) or not rows:
+        return None
+    path = os.path.join(table_dir(base_dir, table), f"month={target_date[:7]}", f"{target_date}.parquet")
+    _write_table(_to_table(rows, table), path)
+    return path
+
+
+def append_ohlcv(frames: Dict[str, Any], start: str = None, end: str = None, base_dir: str = None) -> int:
+    """
+    Archive daily bars ({ticker: DataFrame with Open/High/Low/Close/Volume, date index}),
+    one file per date within [start, end]. Bars already archived for other tickers are
+    kept, so partial downloads (retries, single symbols) merge into the day's file.
+    Returns the number of date files written.
+    """
+    import pandas as pd
+
+    if not (base_dir or enabled()) or not frames:
+        return 0
+    parts = []
+    for ticker, df in frames.items():
+        bars = df[["Open", "High", "Low", "Close", "Volume"]].dropna(subset=["Close"])
+        bars.columns = ["open", "high", "low", "close", "volume"]
+        bars.insert(0, "ticker", ticker)
+        bars.insert(0, "date", pd.DatetimeIndex(bars.index).strftime("%Y-%m-%d"))
+        parts.append(bars)
+    bars = pd.concat(parts, ignore_index=True)
+    if start:
+        bars = bars[bars["date"] >= start]
+    if end:
+        bars = bars[bars["date"] <= end]
+    bars["volume"] = bars["volume"].astype("Int64")
+    bars = bars.astype(object).where(bars.notna(), None)
+
+    written = 0
+    for day, group in bars.groupby("date"):
+        merged = {r["ticker"]: r for r in read(day, day, base_dir=base_dir, table=OHLCV).to_pylist()}
+        merged.update({r["ticker"]: r for r in group.to_dict("records")})
+        append_day(day, list(merged.values()), base_dir, table=OHLCV)
+        written += 1
+    return written
+
+
+def compact_month(month: str, base_dir: str = None, table: str = TABLE) -> Optional[Dict[str, Any]]:
+    """
+    Merge the daily files of a month (and any earlier compacted file) into one file,
+    then delete the daily files. Daily rows replace compacted rows of the same date.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    month_dir = os.path.join(table_dir(base_dir, table), f"month={month}")
+    if not os.path.isdir(month_dir):
+        return None
+    daily = sorted(f for f in os.listdir(month_dir) if f.endswith(".parquet") and f != COMPACTED_FILE)
+    if not daily:
+        return None
+    tables = [pq.read_table(os.path.join(month_dir, f)) for f in daily]
+    compacted_path = os.path.join(month_dir, COMPACTED_FILE)
+    if os.path.exists(compacted_path):
+        previous = pq.read_table(compacted_path)
+        daily_dates = pa.array([date.fromisoformat(f[:-len(".parquet")]) for f in daily], type=pa.date32())
+        tables.insert(0, previous.filter(pc.invert(pc.is_in(previous["date"], value_set=daily_dates))))
+    merged = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+    _write_table(merged, compacted_path)
+    for f in daily:
+        os.remove(os.path.join(month_dir, f))
+    return {"month": month, "merged_files": len(daily), "rows": merged.num_rows,
+            "bytes": os.path.getsize(compacted_path)}
+
+
+def months(base_dir: str = None, table: str = TABLE) -> List[str]:
+    root = table_dir(base_dir, table)
+    if not os.path.isdir(root):
+        return []
+    return sorted(d[len("month="):] for d in os.listdir(root) if d.startswith("month="))
+
+
+def files(base_dir: str = None, table: str = TABLE, start: str = None, end: str = None) -> Dict[str, List]:
+    """
+    Files to read for [start, end]: {"daily": [paths], "compacted": [paths], "daily_dates": [ISO dates]}.
+    Rows of a compacted file whose date is in daily_dates are superseded by the daily file.
+    """
+    result = {"daily": [], "compacted": [], "daily_dates": []}
+    for month in months(base_dir, table):
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        month_dir = os.path.join(table_dir(base_dir, table), f"month={month}")
+        for f in sorted(os.listdir(month_dir)):
+            if not f.endswith(".parquet"):
+                continue
+            if f == COMPACTED_FILE:
+                result["compacted"].append(os.path.join(month_dir, f))
+                continue
+            day = f[:-len(".parquet")]
+            result["daily_dates"].append(day)
+            if (start and day < start) or (end and day > end):
+                continue
+            result["daily"].append(os.path.join(month_dir, f))
+    return result
+
+
+def signature(base_dir: str = None, tables: Iterable[str] = (TABLE, OHLCV)) -> str:
+    """Cheap change stamp of the archive (file names, sizes, mtimes), for result caches."""
+    parts = []
+    for table in tables:
+        found = files(base_dir, table)
+        for path in found["daily"] + found["compacted"]:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def read(start: str = None, end: str = None, columns: Iterable[str] = None, filters=None, base_dir: str = None,
+         table: str = TABLE):
+    """
+    Arrow table of archived rows with start <= date <= end (ISO dates, inclusive).
+    `filters` are extra pyarrow filter tuples, e.g. [("signal", "in", ["BUY", "AGGRESSIVE"])].
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    wanted = list(columns) if columns else None
+    if wanted and "date" not in wanted:
+        wanted.append("date")
+    date_filters = []
+    if start:
+        date_filters.append(("date", ">=", date.fromisoformat(start)))
+    if end:
+        date_filters.append(("date", "<=", date.fromisoformat(end)))
+
+    found = files(base_dir, table, start, end)
+    tables = [pq.read_table(path, columns=wanted, filters=filters or None) for path in found["daily"]]
+    daily_dates = [date.fromisoformat(d) for d in found["daily_dates"]]
+    extra = [("date", "not in", daily_dates)] if daily_dates else []
+    for path in found["compacted"]:
+        tables.append(pq.read_table(path, columns=wanted, filters=(date_filters + extra + list(filters or [])) or None))
+    if not tables:
+        empty = schema(table).empty_table()
+        return empty.select(wanted) if wanted else empty
+    # One dictionary per column across files (group_by / joins need unified dictionaries)
+    return pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+
+
+def archive_stats(base_dir: str = None, table: str = TABLE) -> Dict[str, Any]:
+    count, size = 0, 0
+    for root, _, names in os.walk(table_dir(base_dir, table)):
+        for name in names:
+            if name.endswith(".parquet"):
+                count += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return {"months": len(months(base_dir, table)), "files": count, "bytes": size,
+            "checked_at": datetime.now().isoformat(timespec="seconds")}
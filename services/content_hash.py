@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+from services.db_client import fetch_all, MAX_ROWS_PER_REQUEST
+
+# Change detection for batch upserts: each stored row carries a hash of its content,
+# so reruns only write rows that are new or actually changed.
+HASH_COLUMN = "content_hash"
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Stable hash of a record (key order independent, hash column excluded)."""
+    body = {k: v for k, v in record.items() if k != HASH_COLUMN}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fetch_hashes(supabase, table: str, target_date: str, key: str = "ticker",
+                 page_size: int = MAX_ROWS_PER_REQUEST) -> Dict[str, str]:
+    """{key: stored hash} for every row of one date (paged only past the API row cap)."""
+    rows = fetch_all(lambda: (
+        supabase.table(table)
+        .select(f"{key}, {HASH_COLUMN}")
+        .eq("date", target_date)
+        .order(key)
+    ), page_size)
+    return {row[key]: row.get(HASH_COLUMN) for row in rows}
+
+
+def changed_rows(rows: List[Dict[str, Any]], existing: Dict[str, str],
+                 key: str = "ticker") -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Rows to write (with their hash column set) and counts of new / changed / unchanged.
+    Input rows are not modified.
+    """
+    to_write = []
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    for row in rows:
+        digest = content_hash(row)
+        stored = existing.get(row[key])
+        if row[key] not in existing:
+            counts["new"] += 1
+        elif stored != digest:
+            counts["changed"] += 1
+        else:
+            counts["unchanged"] += 1
+            continue
+        to_write.append({**row, HASH_COLUMN: digest})
+    return to_write, counts
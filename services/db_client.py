@@ -1,14 +1,75 @@
-
 import os
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
+# DB_BACKEND=supabase (default) | sqlite
+# sqlite: embedded local stand-in (offline batch runs, API tests, benchmarks)
+DB_BACKEND: str = os.environ.get("DB_BACKEND", "supabase").lower()
+SQLITE_PATH: str = os.environ.get("SQLITE_PATH", "data/local.db")
+
+# PostgREST max-rows default
+MAX_ROWS_PER_REQUEST = 1000
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _create_client():
+    if DB_BACKEND == "sqlite":
+        from services.sqlite_client import create_sqlite_client
+
+        return create_sqlite_client(SQLITE_PATH)
+    if DB_BACKEND == "supabase":
+        from supabase import create_client
+        from supabase.lib.client_options import ClientOptions
+
+        url: str = os.environ.get("SUPABASE_URL")
+        key: str = os.environ.get("SUPABASE_KEY")
+
+        if not url or not key:
+            raise ValueError("Supabase credentials not found in environment variables.")
+
+        # One shared client: its HTTP session keeps pooled keep-alive connections.
+        # Per-request timeout so a stuck round trip cannot pin an API worker thread.
+        timeout = float(os.environ.get("DB_QUERY_TIMEOUT", "10"))
+        return create_client(url, key, options=ClientOptions(postgrest_client_timeout=timeout))
+    raise ValueError(f"Unknown DB_BACKEND: {DB_BACKEND} (expected 'supabase' or 'sqlite')")
+
+
+def get_client():
+    """
+    The shared DB client, created on first use (importing supabase and opening
+    the connection is deferred until a query actually runs).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+
+class _LazyClient:
+    """Stands in for the client at import time; `supabase.table(...)` works unchanged."""
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+supabase = _LazyClient()
 
-if not url or not key:
-    raise ValueError("Supabase credentials not found in environment variables.")
 
-supabase: Client = create_client(url, key)
+def fetch_all(build_query, page_size: int = MAX_ROWS_PER_REQUEST) -> list:
+    """
+    Execute an ordered query in pages of `page_size` rows (PostgREST caps rows per
+    request). `build_query` returns a fresh builder; usually one round trip.
+    Synchronous counterpart of app.db.run_query_all for the batch jobs.
+    """
+    rows = []
+    while True:
+        res = build_query().range(len(rows), len(rows) + page_size - 1).execute()
+        rows.extend(res.data)
+        if len(res.data) < page_size:
+            return rows
@@ -0,0 +1,163 @@
+import random
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Failure reasons
+BATCH_ERROR = "batch_error"                  # The whole request raised
+NO_DATA = "no_data"                          # Missing / all-NaN in an otherwise good response
+INSUFFICIENT_HISTORY = "insufficient_history"  # Reported by the caller (too few bars)
+ANALYSIS_ERROR = "analysis_error"            # Reported by the caller (exception while scoring)
+
+RETRYABLE = {BATCH_ERROR, NO_DATA}
+
+
+class DownloadScheduler:
+    """
+    Batched market-data download with adaptive batch size and targeted retries.
+
+    - Batch size grows while requests are fast and clean, and halves when a batch is
+      slow, raises, or comes back with many missing symbols.
+    - Symbols that failed (request error / missing data) are re-requested in smaller
+      batches after an exponential backoff, up to `max_retries` rounds.
+    - Every symbol ends up either delivered or in `failures` with a reason.
+
+    `download(batch)` returns the frame (columns: ticker -> OHLCV, as yfinance with
+    group_by='ticker') and an optional {ticker: error message} dict.
+    """
+
+    def __init__(
+        self,
+        download: Callable[[List[str]], Tuple[Any, Optional[Dict[str, str]]]],
+        batch_size: int = 50,
+        min_batch: int = 5,
+        max_batch: int = 200,
+        target_seconds: float = 20.0,
+        max_retries: int = 2,
+        backoff: float = 2.0,
+    ):
+        self.download = download
+        self.batch_size = batch_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.target_seconds = target_seconds
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failures: Dict[str, Tuple[str, str]] = {}  # ticker -> (reason, detail)
+        self.delivered = 0
+        self.recovered = 0
+        self.requests = 0
+        self.total = 0
+        self.batch_sizes: List[int] = []
+
+    # --- Adaptation ---
+    def _adapt(self, size: int, elapsed: float, missing_ratio: float, raised: bool):
+        if raised or missing_ratio > 0.2 or elapsed > self.target_seconds:
+            self.batch_size = max(self.min_batch, size // 2)
+        elif missing_ratio < 0.05 and elapsed < self.target_seconds / 2:
+            self.batch_size = min(self.max_batch, int(self.batch_size * 1.5) or 1)
+
+    @staticmethod
+    def _extract(data, ticker: str, batch: List[str]):
+        import pandas as pd
+
+        if data is None or getattr(data, "empty", True):
+            return None
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                return None
+            df = data[ticker]
+        elif len(batch) == 1:
+            df = data
+        else:
+            return None
+        df = df.dropna(how="all")
+        if df.empty or "Close" not in df or df["Close"].dropna().empty:
+            return None
+        return df.copy()
+
+    def _fetch(self, batch: List[str]) -> Iterator[Tuple[str, Any]]:
+        self.requests += 1
+        self.batch_sizes.append(len(batch))
+        started = time.perf_counter()
+        try:
+            result = self.download(batch)
+        except Exception as e:
+            self._adapt(len(batch), time.perf_counter() - started, 1.0, raised=True)
+            for ticker in batch:
+                self.failures[ticker] = (BATCH_ERROR, str(e)[:200])
+            print(f"    ⚠️ Batch of {len(batch)} failed ({e}); batch size -> {self.batch_size}")
+            return
+        elapsed = time.perf_counter() - started
+        data, errors = result if isinstance(result, tuple) else (result, None)
+        errors = errors or {}
+
+        frames, missing = [], 0
+        for ticker in batch:
+            df = self._extract(data, ticker, batch)
+            if df is None:
+                missing += 1
+                self.failures[ticker] = (NO_DATA, str(errors.get(ticker, "no rows returned"))[:200])
+            else:
+                frames.append((ticker, df))
+        self._adapt(len(batch), elapsed, missing / len(batch), raised=False)
+        print(f"    Downloaded {len(batch) - missing}/{len(batch)} in {elapsed:.1f}s (next batch {self.batch_size})")
+
+        for ticker, df in frames:
+            if self.failures.pop(ticker, None) is not None:
+                self.recovered += 1
+            self.delivered += 1
+            yield ticker, df
+
+    def iter_frames(self, tickers: List[str]) -> Iterator[Tuple[str, Any]]:
+        """Yield (ticker, DataFrame) for every symbol that could be downloaded."""
+        self.total += len(tickers)
+        pending = list(tickers)
+        i = 0
+        while i < len(pending):
+            batch = pending[i:i + self.batch_size]
+            i += len(batch)
+            yield from self._fetch(batch)
+
+        for attempt in range(1, self.max_retries + 1):
+            retry = [t for t, (reason, _) in self.failures.items() if reason in RETRYABLE]
+            if not retry:
+                break
+            delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+            size = max(self.min_batch, self.batch_size // 4)
+            print(f"    🔁 Retry {attempt}/{self.max_retries}: {len(retry)} symbols in batches of {size} after {delay:.1f}s")
+            time.sleep(delay)
+            for j in range(0, len(retry), size):
+                yield from self._fetch(retry[j:j + size])
+
+    # --- Caller-reported failures / report ---
+    def mark_failed(self, ticker: str, reason: str, detail: str = ""):
+        self.failures[ticker] = (reason, str(detail)[:200])
+
+    def failed(self) -> Dict[str, str]:
+        return {t: reason for t, (reason, _) in sorted(self.failures.items())}
+
+    def report(self) -> Dict[str, Any]:
+        by_reason: Dict[str, int] = {}
+        for reason, _ in self.failures.values():
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+        analyzed = self.total - len(self.failures)
+        return {
+            "total": self.total,
+            "downloaded": self.delivered,
+            "analyzed": analyzed,
+            "coverage": round(analyzed / self.total, 4) if self.total else 1.0,
+            "recovered_by_retry": self.recovered,
+            "requests": self.requests,
+            "final_batch_size": self.batch_size,
+            "failures": by_reason,
+        }
+
+    def print_report(self, limit: int = 20):
+        report = self.report()
+        print(f"    📊 Coverage: {report['analyzed']}/{report['total']} ({report['coverage']:.1%}), "
+              f"{report['requests']} requests, {report['recovered_by_retry']} recovered by retry")
+        for reason, count in sorted(report["failures"].items()):
+            print(f"       {reason}: {count}")
+        for ticker, (reason, detail) in sorted(self.failures.items())[:limit]:
+            print(f"       - {ticker}: {reason} {detail}")
+        return report
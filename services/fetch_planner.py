@@ -0,0 +1,143 @@
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+# Shared market-data cache for one batch process.
+# Stages declare (symbols, [start, end)) needs up front with `need()`; the first request
+# for any symbol downloads it over the union of every window declared for it, batching
+# symbols whose merged windows start on the same day into one yfinance request. Later
+# requests are sliced from memory, so overlapping windows (e.g. ^GSPC for the macro
+# snapshot and for the correlation history) cost one download per run.
+# Windows follow yfinance: start inclusive, end exclusive. Starts are floored to midnight
+# (a run-time start would make yfinance drop that day's bar).
+
+
+def _ts(value):
+    import pandas as pd
+
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _day(value):
+    return _ts(value).normalize()
+
+
+def yf_download(symbols: List[str], start, end):
+    """Daily bars (adjusted) as yfinance returns them with group_by='ticker', plus per-symbol errors."""
+    import yfinance as yf
+
+    data = yf.download(symbols, start=start, end=end, group_by="ticker", auto_adjust=True,
+                       threads=True, progress=False)
+    # yfinance keeps per-symbol error messages here instead of raising
+    errors = dict(getattr(getattr(yf, "shared", None), "_ERRORS", None) or {})
+    return data, errors
+
+
+class FetchPlanner:
+    def __init__(self, download: Callable[[List[str], Any, Any], Tuple[Any, Dict[str, str]]] = None):
+        self._download = download or yf_download
+        self._needs: Dict[str, Tuple[Any, Any]] = {}      # symbol -> merged [start, end)
+        self._frames: Dict[str, Tuple[Any, Any, Any]] = {}  # symbol -> (start, end, DataFrame)
+        self.requests = 0
+        self.downloaded = 0   # Symbols fetched from the network
+        self.served = 0       # Symbol frames handed to stages
+        self.errors: Dict[str, str] = {}
+        self._attempted: Set[str] = set()
+
+    def need(self, symbols: Iterable[str], start, end):
+        """Declare a window; merged with earlier declarations of the same symbol."""
+        start, end = _day(start), _ts(end)
+        for symbol in symbols:
+            current = self._needs.get(symbol)
+            if current is None:
+                self._needs[symbol] = (start, end)
+            else:
+                self._needs[symbol] = (min(current[0], start), max(current[1], end))
+
+    def _covered(self, symbol: str, start, end) -> bool:
+        cached = self._frames.get(symbol)
+        return cached is not None and cached[0] <= start and cached[1] >= end
+
+    def _fetch(self, symbols: List[str]):
+        import pandas as pd
+
+        # One request per merged window start; the request ends at the latest end of its group
+        groups: Dict[Any, List[str]] = {}
+        for symbol in symbols:
+            groups.setdefault(self._needs[symbol][0], []).append(symbol)
+        # Declared needs never requested yet ride along with a request of the same start
+        # (failed symbols are only re-requested explicitly, e.g. by scheduler retries)
+        for symbol, (start, _) in self._needs.items():
+            if start in groups and symbol not in self._attempted and symbol not in groups[start]:
+                groups[start].append(symbol)
+        for start, group in sorted(groups.items()):
+            end = max(self._needs[s][1] for s in group)
+            self.requests += 1
+            self._attempted.update(group)
+            data, errors = self._download(group, start, end)
+            for symbol in group:
+                df = None
+                if data is not None and not data.empty:
+                    if isinstance(data.columns, pd.MultiIndex):
+                        if symbol in data.columns.get_level_values(0):
+                            df = data[symbol]
+                    elif len(group) == 1:
+                        df = data
+                if df is not None:
+                    df = df.dropna(how="all")
+                    if df.index.tz is not None:
+                        df.index = df.index.tz_localize(None)
+                if df is None or df.empty:
+                    self.errors[symbol] = str(errors.get(symbol, "no rows returned"))[:200]
+                    continue
+                self.errors.pop(symbol, None)
+                self.downloaded += 1
+                self._frames[symbol] = (start, end, df)
+
+    def frames(self, symbols: Iterable[str], start, end) -> Dict[str, Any]:
+        """
+        {symbol: DataFrame sliced to [start, end)} for every symbol that has data.
+        Missing or too-short cached windows are (re)fetched together with any declared
+        needs of the same symbols; failed symbols are retried on the next request.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        start, end = _day(start), _ts(end)
+        self.need(symbols, start, end)
+        missing = [s for s in symbols if not self._covered(s, start, end)]
+        if missing:
+            self._fetch(missing)
+        result = {}
+        for symbol in symbols:
+            cached = self._frames.get(symbol)
+            if cached is None:
+                continue
+            df = cached[2]
+            result[symbol] = df[(df.index >= start) & (df.index < end)]
+            self.served += 1
+        return result
+
+    def download(self, symbols: List[str], start, end):
+        """frames() shaped like yf.download(group_by='ticker') + errors (DownloadScheduler callback)."""
+        import pandas as pd
+
+        found = self.frames(symbols, start, end)
+        data = pd.concat(found, axis=1) if found else pd.DataFrame()
+        return data, {s: self.errors.get(s, "no rows returned") for s in symbols if s not in found}
+
+    def panel(self, symbols: Iterable[str], start, end, path: str = None):
+        """frames() packed into a shared OHLCVPanel for process workers (caller unlinks it)."""
+        from services.ohlcv_panel import from_frames
+
+        return from_frames(self.frames(symbols, start, end), path=path)
+
+    def report(self) -> Dict[str, int]:
+        return {"requests": self.requests, "downloaded": self.downloaded, "served": self.served,
+                "cached_symbols": len(self._frames), "failed": len(self.errors)}
+
+    def print_report(self):
+        r = self.report()
+        print(f"    📦 Market data: {r['requests']} requests, {r['downloaded']} symbols downloaded, "
+              f"{r['served']} frames served to stages ({r['failed']} symbols without data)")
+
+
+# Shared by every stage of the batch process
+planner = FetchPlanner()
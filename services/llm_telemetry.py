@@ -0,0 +1,310 @@
+import math
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import config
+
+# Accounting for every LLM generate_content call (macro + per-stock deep dives):
+# tokens (from usage_metadata, else estimated from the prompt / text), latency,
+# retries, 429s, truncation and JSON-parse failures. One summary per batch process,
+# persisted to `llm_usage_log` for a rolling daily quota projection.
+TABLE = "llm_usage_log"
+PROJECTION_DAYS = 7
+# Warn when the day's projected requests reach this share of LLM_DAILY_REQUEST_LIMIT
+DAILY_WARN_SHARE = 0.8
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 ASCII characters per token, ~1.5 characters per token for Japanese."""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = str(error)
+    return "429" in text or "Quota exceeded" in text or "ResourceExhausted" in text
+
+
+def _finish_reason(response) -> Optional[str]:
+    try:
+        reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return None
+    name = getattr(reason, "name", None) or str(reason)
+    # Older SDKs return the bare enum value (2 = MAX_TOKENS)
+    return "MAX_TOKENS" if name == "2" else name
+
+
+def _usage(response) -> Tuple[Optional[int], Optional[int]]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None) or None, getattr(usage, "candidates_token_count", None) or None
+
+
+def quota_date() -> date:
+    """Current day in the quota's timezone (local date if the zone is unknown)."""
+    from zoneinfo import ZoneInfo
+
+    try:
+        return datetime.now(ZoneInfo(config.LLM_QUOTA_TIMEZONE)).date()
+    except (KeyError, ValueError) as e:
+        print(f"!!! Unknown LLM_QUOTA_TIMEZONE ({e}); using the local date.")
+        return date.today()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMTelemetry:
+    """Per-process record of LLM calls plus the run summary / quota projection."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self.started_at = datetime.now()
+        self.quota_date = quota_date()
+        # Shards of one run start together: keep their rows distinct
+        self.run_id = f"{self.started_at.isoformat(timespec='seconds')}-{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+
+    def generate(
+        self,
+        model,
+        prompt: str,
+        kind: str,
+        generation_config: Dict[str, Any] = None,
+        max_retries: int = 1,
+        retry_delay: Callable[[int], float] = lambda attempt: 10 * (attempt + 1),
+    ):
+        """
+        model.generate_content with accounting. 429s are retried up to `max_retries`
+        attempts in total (sleeping retry_delay(attempt)); other errors are raised at once.
+        Returns (response, call record); the caller may flag a JSON failure on the record.
+        """
+        call = {
+            "kind": kind,
+            "at": time.time(),
+            "prompt_chars": len(prompt),
+            "prompt_tokens": None,
+            "output_tokens": None,
+            "estimated": False,
+            "latency": 0.0,
+            "attempts": 0,
+            "rate_limited": 0,
+            "truncated": False,
+            "json_error": False,
+            "error": None,
+        }
+        with self._lock:
+            self.calls.append(call)
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        for attempt in range(max_retries):
+            call["attempts"] = attempt + 1
+            started = time.perf_counter()
+            try:
+                response = model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                call["latency"] += time.perf_counter() - started
+                if is_rate_limited(e):
+                    call["rate_limited"] += 1
+                    if attempt < max_retries - 1:
+                        delay = retry_delay(attempt)
+                        print(f"    LLM 429 ({kind}, attempt {attempt + 1}/{max_retries}); sleeping {delay:.0f}s.")
+                        time.sleep(delay)
+                        continue
+                call["error"] = type(e).__name__
+                call["prompt_tokens"] = estimate_tokens(prompt)
+                call["estimated"] = True
+                raise
+            call["latency"] += time.perf_counter() - started
+            break
+
+        prompt_tokens, output_tokens = _usage(response)
+        if prompt_tokens is None or output_tokens is None:
+            call["estimated"] = True
+            try:
+                text = response.text
+            except Exception:
+                text = ""
+            prompt_tokens = prompt_tokens or estimate_tokens(prompt)
+            output_tokens = output_tokens or estimate_tokens(text)
+        call["prompt_tokens"] = prompt_tokens
+        call["output_tokens"] = output_tokens
+        call["truncated"] = _finish_reason(response) == "MAX_TOKENS"
+        return response, call
+
+    @staticmethod
+    def mark_json_error(call: Dict[str, Any]):
+        call["json_error"] = True
+
+    # --- Run summary ---
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self.calls)
+        by_kind: Dict[str, Dict[str, Any]] = {}
+        for kind in sorted({c["kind"] for c in calls}) + ["total"]:
+            group = [c for c in calls if kind == "total" or c["kind"] == kind]
+            latencies = [c["latency"] for c in group]
+            prompt_tokens = [c["prompt_tokens"] or 0 for c in group]
+            by_kind[kind] = {
+                "calls": len(group),
+                "requests": sum(c["attempts"] for c in group),
+                "errors": sum(1 for c in group if c["error"]),
+                "rate_limited": sum(c["rate_limited"] for c in group),
+                "retries": sum(c["attempts"] - 1 for c in group),
+                "truncated": sum(1 for c in group if c["truncated"]),
+                "json_errors": sum(1 for c in group if c["json_error"]),
+                "estimated": sum(1 for c in group if c["estimated"]),
+                "prompt_tokens": sum(prompt_tokens),
+                "output_tokens": sum(c["output_tokens"] or 0 for c in group),
+                "max_prompt_tokens": max(prompt_tokens, default=0),
+                "latency_avg": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "latency_p95": round(_percentile(latencies, 0.95), 3),
+                "latency_max": round(max(latencies, default=0.0), 3),
+            }
+        return {"by_kind": by_kind, "peak_minute": self.peak_minute(calls)}
+
+    @staticmethod
+    def peak_minute(calls: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Most requests / tokens started within any 60-second window (vs RPM / TPM limits)."""
+        events = sorted((c["at"], c["attempts"], (c["prompt_tokens"] or 0) + (c["output_tokens"] or 0)) for c in calls)
+        peak_requests, peak_tokens = 0, 0
+        start, requests, tokens = 0, 0, 0
+        for at, attempts, used in events:
+            requests += attempts
+            tokens += used
+            while events[start][0] < at - 60:
+                requests -= events[start][1]
+                tokens -= events[start][2]
+                start += 1
+            peak_requests = max(peak_requests, requests)
+            peak_tokens = max(peak_tokens, tokens)
+        return {"requests": peak_requests, "tokens": peak_tokens}
+
+    def print_summary(self, summary: Dict[str, Any] = None):
+        summary = summary or self.summary()
+        print(">>> LLM usage:")
+        for kind, s in summary["by_kind"].items():
+            print(f"    {kind:<6} {s['calls']} calls ({s['requests']} requests, {s['retries']} retries, "
+                  f"{s['rate_limited']}x 429, {s['errors']} errors, {s['truncated']} truncated, "
+                  f"{s['json_errors']} JSON failures) | tokens in {s['prompt_tokens']} / out {s['output_tokens']}"
+                  f"{' (partly estimated)' if s['estimated'] else ''} | max prompt {s['max_prompt_tokens']} | "
+                  f"latency avg {s['latency_avg']}s p95 {s['latency_p95']}s max {s['latency_max']}s")
+        peak = summary["peak_minute"]
+        print(f"    peak minute: {peak['requests']} requests (limit {config.LLM_RPM_LIMIT}), "
+              f"{peak['tokens']} tokens (limit {config.LLM_TPM_LIMIT})")
+        if peak["requests"] >= 0.8 * config.LLM_RPM_LIMIT or peak["tokens"] >= 0.8 * config.LLM_TPM_LIMIT:
+            print("    ⚠️ Within 20% of the per-minute limit: expect 429s (shrink prompts or slow the deep dives).")
+
+    # --- Persistence / daily projection ---
+    def save_run(self, supabase, summary: Dict[str, Any]) -> bool:
+        total = summary["by_kind"]["total"]
+        try:
+            supabase.table(TABLE).upsert({
+                "date": self.quota_date.isoformat(),
+                "run_id": self.run_id,
+                "requests": total["requests"],
+                "prompt_tokens": total["prompt_tokens"],
+                "output_tokens": total["output_tokens"],
+                "rate_limited": total["rate_limited"],
+                "summary": summary,
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"!!! Could not save LLM usage ({e}).")
+            return False
+
+    def projection(self, supabase, days: int = PROJECTION_DAYS) -> Optional[Dict[str, Any]]:
+        """
+        Today's requests / tokens so far (quota day), the rolling daily average and the
+        projected day total: today's requests + remaining scheduled runs x average
+        requests per run (the daily average before any run of the day was logged).
+        """
+        today = self.quota_date
+        start = (today - timedelta(days=days)).isoformat()
+        try:
+            res = (
+                supabase.table(TABLE)
+                .select("date, requests, prompt_tokens, output_tokens")
+                .gte("date", start)
+                .order("date")
+                .execute()
+            )
+        except Exception as e:
+            print(f"!!! Could not load LLM usage history ({e}).")
+            return None
+        daily: Dict[str, Dict[str, int]] = {}
+        for row in res.data:
+            day = daily.setdefault(str(row["date"])[:10], {"requests": 0, "tokens": 0, "runs": 0})
+            day["requests"] += row.get("requests") or 0
+            day["tokens"] += (row.get("prompt_tokens") or 0) + (row.get("output_tokens") or 0)
+            day["runs"] += 1
+        today_usage = daily.pop(today.isoformat(), {"requests": 0, "tokens": 0, "runs": 0})
+        history = [daily[d] for d in sorted(daily)]
+        average = sum(d["requests"] for d in history) / len(history) if history else None
+
+        # Average requests per run: history first, else today's runs
+        basis = history if history else [today_usage]
+        runs = sum(d["runs"] for d in basis)
+        per_run = sum(d["requests"] for d in basis) / runs if runs else 0.0
+        if today_usage["runs"]:
+            remaining = max(0, config.LLM_RUNS_PER_DAY - today_usage["runs"])
+            projected = round(today_usage["requests"] + remaining * per_run)
+        else:
+            projected = round(average or 0)
+
+        limit = config.LLM_DAILY_REQUEST_LIMIT
+        return {
+            "quota_date": today.isoformat(),
+            "today_requests": today_usage["requests"],
+            "today_tokens": today_usage["tokens"],
+            "today_runs": today_usage["runs"],
+            "avg_daily_requests": round(average, 1) if average is not None else None,
+            "avg_run_requests": round(per_run, 1),
+            "peak_daily_requests": max((d["requests"] for d in history), default=None),
+            "projected_requests": projected,
+            "daily_limit": limit,
+            "today_share": round(today_usage["requests"] / limit, 4) if limit else None,
+            "projected_share": round(projected / limit, 4) if limit else None,
+        }
+
+    def report_run(self, supabase=None):
+        """Print the run summary; with a DB client also persist it and print the daily projection."""
+        if not self.calls:
+            return None
+        summary = self.summary()
+        self.print_summary(summary)
+        if supabase is None or not self.save_run(supabase, summary):
+            return summary
+        projection = self.projection(supabase)
+        if projection:
+            avg = projection["avg_daily_requests"]
+            share = projection["today_share"]  # None when LLM_DAILY_REQUEST_LIMIT=0 (no limit)
+            quota = f"{share:.1%} of {projection['daily_limit']}/day" if share is not None else "no daily limit"
+            print(f"    today ({projection['quota_date']}, {config.LLM_QUOTA_TIMEZONE}): "
+                  f"{projection['today_requests']} requests ({quota}), {projection['today_tokens']} tokens | "
+                  f"{PROJECTION_DAYS}-day avg {avg if avg is not None else '-'} requests/day, "
+                  f"peak {projection['peak_daily_requests'] if projection['peak_daily_requests'] is not None else '-'}")
+            projected_share = projection["projected_share"]
+            print(f"    projected day total: {projection['projected_requests']} requests "
+                  f"({projection['today_runs']}/{config.LLM_RUNS_PER_DAY} runs logged, "
+                  f"{projection['avg_run_requests']} requests/run)"
+                  f"{f' = {projected_share:.1%} of the daily limit' if projected_share is not None else ''}")
+            if projected_share is not None and projected_share >= DAILY_WARN_SHARE:
+                print(f"    ⚠️ Projected to use {projected_share:.0%} of the daily request limit: "
+                      f"expect 429s late in the quota day (fewer deep dives or runs).")
+            summary["projection"] = projection
+        return summary
+
+
+# Shared by every LLM caller in the process
+telemetry = LLMTelemetry()
@@ -1,6 +1,4 @@
 
-import feedparser
-import google.generativeai as genai
 import json
 import os
 import re
@@ -8,23 +6,32 @@ from typing import Dict, Any
 from datetime import datetime
 
 from app.config import config
-from services.news_scraper import fetch_historical_headlines
+from services.llm_telemetry import telemetry
+
+MODEL_NAME = "gemma-3-27b-it"
 
 class MacroAnalyzer:
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if self.api_key:
+        # Created on first use: importing google.generativeai is slow and
+        # processes that never call the LLM should not pay for it.
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None and self.api_key:
+            import google.generativeai as genai
+
             genai.configure(api_key=self.api_key)
             # Switch to Gemma 3 27B IT
-            self.model = genai.GenerativeModel(
-                model_name="gemma-3-27b-it",
+            self._model = genai.GenerativeModel(
+                model_name=MODEL_NAME,
                 generation_config={
                     "temperature": 0.2,       # Low temp for factual accuracy
                     "max_output_tokens": 250, # Slightly higher to allow full Japanese formation
                 }
             )
-        else:
-            self.model = None
+        return self._model
 
     def fetch_news_headlines(self, target_date: datetime = None) -> str:
         """
@@ -41,10 +48,14 @@ class MacroAnalyzer:
             # Let's use RSS if target_date is Today.
             today = datetime.now().date()
             if target_date.date() < today:
+                from services.news_scraper import fetch_historical_headlines
+
                 print(f"    Fetching Historical News for {target_date.strftime('%Y-%m-%d')}...")
                 return fetch_historical_headlines(target_date)
         
         # Default / Today Mode (RSS)
+        import feedparser
+
         print("    Fetching RSS Headlines...")
         headlines = []
         for url in config.RSS_FEEDS:
@@ -116,13 +127,16 @@ Return a valid JSON object. Do not include any explanations or markdown ticks (`
 }}
 """
         
+        call = None
         try:
 
             # Increase output limit for Macro Analysis (needs more tokens for full JSON)
             # 2000 tokens to ensure no truncation
-            response = self.model.generate_content(
+            response, call = telemetry.generate(
+                self.model,
                 prompt,
-                generation_config={"max_output_tokens": 2000, "temperature": 0.2}
+                "macro",
+                generation_config={"max_output_tokens": 2000, "temperature": 0.2},
             )
             
             # Robust JSON extraction
@@ -139,7 +153,11 @@ Return a valid JSON object. Do not include any explanations or markdown ticks (`
             # Simple cleanup for common trailing comma issues
             text = re.sub(r",\s*([\]}])", r"\1", text)
             
-            result = json.loads(text)
+            try:
+                result = json.loads(text)
+            except ValueError:
+                telemetry.mark_json_error(call)
+                raise
             
             # Ensure compatibility
             if "reason_summary" not in result and "summary" in result:
@@ -190,29 +208,12 @@ Return a valid JSON object. Do not include any explanations or markdown ticks (`
 ### 出力
 """
         
-        import time
-        import re
-        from google.api_core import exceptions
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(prompt)
-                return response.text.strip()
-            except Exception as e:
-                error_str = str(e)
-                # Handle standard 429
-                if "429" in error_str or "Quota exceeded" in error_str or "ResourceExhausted" in error_str:
-                    print(f"Gemma 429 Exceeded (Attempt {attempt+1}/{max_retries}). Waiting...")
-                    
-                    delay = 10 * (attempt + 1) # Simple backoff
-                    
-                    if attempt < max_retries - 1:
-                        print(f"    Sleeping for {delay:.2f}s before retry.")
-                        time.sleep(delay)
-                        continue
-                
-                print(f"Gemma Analysis Error ({ticker}): {e}")
-                return "AI分析エラー: 通信または生成エラー"
+        # 429s are retried with a simple backoff (10s, 20s) inside the telemetry wrapper
+        try:
+            response, _ = telemetry.generate(self.model, prompt, "stock", max_retries=3)
+            return response.text.strip()
+        except Exception as e:
+            print(f"Gemma Analysis Error ({ticker}): {e}")
+            return "AI分析エラー: 通信または生成エラー"
 
 macro_analyzer = MacroAnalyzer()
@@ -4,6 +4,15 @@ from app.config import config
 
 from datetime import datetime, timedelta
 
+def _period_offset(period: str):
+    """yfinance period string ("5d", "3mo", "1y", ...) -> pandas offset, None if unsupported."""
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for suffix, unit in units.items():
+        number = period[:-len(suffix)]
+        if period.endswith(suffix) and number.isdigit():
+            return pd.DateOffset(**{unit: int(number)})
+    return None
+
 def fetch_historical_data(ticker: str, period: str = "6mo", end_date: datetime = None) -> pd.DataFrame:
     """
     Fetch historical data for a given ticker using yfinance.
@@ -11,28 +20,15 @@ def fetch_historical_data(ticker: str, period: str = "6mo", end_date: datetime =
     """
     try:
         if end_date:
-            # yfinance end is exclusive. To include target_date, we need target_date + 1 day
-            # But here end_date usually implies "Analysis Date".
-            # If we want data available ON Analysis Date morning, we usually mean data up to "Yesterday Close".
-            # But lets assume input is specific.
-            # Usually yf.download(end=X) fetches up to X-1.
-            # If I supply 2024-02-01, I want data UP TO 2024-02-01?
-            # Let's standardize: end_date provided means "latest data point should be ON or BEFORE end_date".
-            # If I pass 2024-02-02, I want close of 2024-02-02 if available?
-            # yfinance 'end' is exclusive. So to get 2024-02-02, end must be 2024-02-03.
+            # yfinance `end` is exclusive: end_date + 1 day keeps the bar of end_date itself.
+            # yfinance ignores `period` once `end` is given, so the start is derived from it
+            # (one request; unknown periods such as "max" fetch the full history).
             end_val = (end_date + timedelta(days=1)).strftime('%Y-%m-%d')
-            data = yf.download(ticker, end=end_val, progress=False, multi_level_index=False)
-            # Slice by period is tricky with download, as start defaults to 1900.
-            # Ideally we calculate start based on period.
-            # But yfinance accepts 'period' OR 'start/end'.
-            # If end is specified, 'period' argument is ignored by yfinance in some versions or conflicts.
-            # So we should calculate start.
-            if period == "6mo":
-                start_val = (end_date - timedelta(days=180)).strftime('%Y-%m-%d')
-                data = yf.download(ticker, start=start_val, end=end_val, progress=False, multi_level_index=False)
-            else:
-                # Default fallback
-                data = yf.download(ticker, end=end_val, progress=False, multi_level_index=False)
+            start_val = None
+            offset = _period_offset(period)
+            if offset is not None:
+                start_val = (pd.Timestamp(end_date) - offset).strftime('%Y-%m-%d')
+            data = yf.download(ticker, start=start_val, end=end_val, progress=False, multi_level_index=False)
         else:
             data = yf.download(ticker, period=period, progress=False, multi_level_index=False)
 
@@ -51,27 +47,35 @@ def fetch_historical_data(ticker: str, period: str = "6mo", end_date: datetime =
         print(f"Error fetching data for {ticker}: {e}")
         return pd.DataFrame()
 
-def fetch_global_market_data(target_date: datetime = None) -> dict:
+def fetch_global_market_data(target_date: datetime = None, planner=None) -> dict:
     """
     Fetch global market data (US indices, FX) change percentage.
     If target_date is provided, calculates change for that specific date.
+    All symbols come from one batched request through the run's fetch planner
+    (shared with other stages that need the same symbols).
     """
+    from services.fetch_planner import planner as shared_planner
+
+    planner = planner or shared_planner
     data_summary = {}
-    
+
+    # Last week up to and including the target date (or today)
+    reference = target_date or datetime.now()
+    end_val = (reference + timedelta(days=1)).strftime('%Y-%m-%d')
+    start_val = (reference - timedelta(days=7)).strftime('%Y-%m-%d')
+    try:
+        frames = planner.frames(list(config.GLOBAL_TICKERS), start_val, end_val)
+    except Exception as e:
+        print(f"Error fetching global data: {e}")
+        return data_summary
+
     for ticker, name in config.GLOBAL_TICKERS.items():
         try:
-            # yfinance
-            ticker_obj = yf.Ticker(ticker)
-            
-            if target_date:
-                # Need history around target date
-                # Fetch 5 days ending at target_date+1
-                end_val = (target_date + timedelta(days=1)).strftime('%Y-%m-%d')
-                start_val = (target_date - timedelta(days=7)).strftime('%Y-%m-%d')
-                hist = ticker_obj.history(start=start_val, end=end_val)
-            else:
-                hist = ticker_obj.history(period=config.GLOBAL_DATA_PERIOD)
-            
+            hist = frames.get(ticker)
+            if hist is None:
+                print(f"Error fetching global data for {name} ({ticker}): {planner.errors.get(ticker, 'no data')}")
+                continue
+            hist = hist.dropna(subset=['Close'])
             if len(hist) < 2:
                 continue
 
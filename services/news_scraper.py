@@ -1,11 +1,12 @@
 
-import feedparser
 from datetime import datetime, timedelta
 
 def fetch_historical_headlines(target_date: datetime) -> str:
     """
     Fetch historical headlines using Google News RSS Search with date range.
     """
+    import feedparser
+
     try:
         next_day = target_date + timedelta(days=1)
         
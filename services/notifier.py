@@ -1,52 +1,51 @@
-
-from typing import List, Dict, Any
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Tuple
 import httpx
 from app.models import AnalysisResult
 from app.config import config
 
+# Discord webhook limits (per message)
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_CHARS_PER_MESSAGE = 6000   # title + description + fields + footer + author, all embeds
+MAX_CONTENT_CHARS = 2000
+MAX_TITLE_CHARS = 256
+MAX_DESCRIPTION_CHARS = 4096
+
+SIGNAL_ORDER = ["BUY", "SELL"]
+
+
 def format_discord_message(results: List[AnalysisResult], macro_sentiment: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Format analysis results into a Discord embed message with S-Stock details and Macro Sentiment.
+    The payload may exceed Discord's per-message limits; send it with send_notification
+    (or pack_embeds) which splits it into compliant messages.
     """
     embeds = []
-    
+
     # 0. Macro Sentiment Embed (First)
     if macro_sentiment:
-        reason = macro_sentiment.get("reason_summary", "")
-        # Filter only integer scores for display
-        scores = {k: v for k, v in macro_sentiment.items() if isinstance(v, int)}
-        
-        score_text = ""
-        for k, v in scores.items():
-            sign = "+" if v > 0 else ""
-            score_text += f"**{k}**: {sign}{v}\n"
-            
-        macro_embed = {
-            "title": "🌍 AI Market Sentiment Analysis",
-            "description": f"{reason}\n\n{score_text}",
-            "color": 0x3498DB # Blue
-        }
-        embeds.append(macro_embed)
-    
+        embeds.append(format_macro_embed(macro_sentiment))
+
     # 1. Individual Ticker Embeds
     for res in results:
         color = 0x808080 # Gray for WAIT
         title_prefix = ""
-        
+
         if res.signal == "BUY":
             color = 0xE74C3C # Red
             title_prefix = "🚨 ALERT: "
         elif res.signal == "SELL":
             color = 0x2ECC71 # Green
-        
+
         # Get sector sentiment if available
         sector = config.TICKER_SECTOR_MAP.get(res.ticker, "Unknown")
         sector_score = 0
         if macro_sentiment:
             sector_score = macro_sentiment.get(sector, macro_sentiment.get("全体", 0))
-        
+
         sector_info = f"Sector ({sector}): {'+' if sector_score > 0 else ''}{sector_score}"
-        
+
         # Build description with S-Stock specific fields
         description = (
             f"**Price:** {res.current_price:,.1f}\n"
@@ -72,19 +71,302 @@ def format_discord_message(results: List[AnalysisResult], macro_sentiment: Dict[
         "embeds": embeds
     }
 
-async def send_notification(content: Dict[str, Any]):
+
+def format_macro_embed(macro_sentiment: Dict[str, Any]) -> Dict[str, Any]:
+    reason = macro_sentiment.get("reason_summary", "")
+    # Filter only integer scores for display
+    scores = {k: v for k, v in macro_sentiment.items() if isinstance(v, int)}
+
+    score_text = ""
+    for k, v in scores.items():
+        sign = "+" if v > 0 else ""
+        score_text += f"**{k}**: {sign}{v}\n"
+
+    return {
+        "title": "🌍 AI Market Sentiment Analysis",
+        "description": f"{reason}\n\n{score_text}",
+        "color": 0x3498DB # Blue
+    }
+
+
+def format_digest(results: List[AnalysisResult], macro_sentiment: Dict[str, Any] = None) -> Dict[str, Any]:
     """
-    Send notification to Discord webhook.
+    Condensed report for high-volume days: one line per ticker, grouped by signal,
+    so ~60 tickers fit in one embed instead of one embed each.
+    """
+    embeds = []
+    if macro_sentiment:
+        embeds.append(format_macro_embed(macro_sentiment))
+
+    groups: Dict[str, List[AnalysisResult]] = {}
+    for res in results:
+        groups.setdefault(res.signal, []).append(res)
+    ordered = [s for s in SIGNAL_ORDER if s in groups] + sorted(s for s in groups if s not in SIGNAL_ORDER)
+
+    for signal in ordered:
+        color = {"BUY": 0xE74C3C, "SELL": 0x2ECC71}.get(signal, 0x808080)
+        items = sorted(groups[signal], key=lambda r: r.upside_ratio, reverse=True)
+        lines = [
+            f"`{r.ticker}` {r.current_price:,.1f} | RSI {r.rsi:.1f} | {r.upside_ratio:.1f}x ATR"
+            for r in items
+        ]
+        # Split the lines over as many embeds as the description limit requires
+        chunk: List[str] = []
+        size = 0
+        part = 0
+        for line in lines + [None]:
+            if line is None or size + len(line) + 1 > MAX_DESCRIPTION_CHARS:
+                if chunk:
+                    part += 1
+                    suffix = "" if part == 1 else f" (cont. {part})"
+                    embeds.append({
+                        "title": f"{signal} ({len(items)}){suffix}",
+                        "description": "\n".join(chunk),
+                        "color": color,
+                    })
+                chunk, size = [], 0
+                if line is None:
+                    break
+            chunk.append(line)
+            size += len(line) + 1
+
+    return {
+        "content": f"S-Stock Analysis Digest ({len(results)} items)",
+        "embeds": embeds,
+    }
+
+
+# --- Packing ---
+def embed_length(embed: Dict[str, Any]) -> int:
+    """Characters counted by Discord toward the 6,000 per-message limit."""
+    total = len(embed.get("title") or "") + len(embed.get("description") or "")
+    total += len((embed.get("footer") or {}).get("text") or "")
+    total += len((embed.get("author") or {}).get("name") or "")
+    for field in embed.get("fields") or []:
+        total += len(field.get("name") or "") + len(field.get("value") or "")
+    return total
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _fit_embed(embed: Dict[str, Any]) -> Dict[str, Any]:
+    """Clip fields that exceed Discord's per-embed limits (would be rejected with 400)."""
+    embed = dict(embed)
+    if embed.get("title"):
+        embed["title"] = _truncate(embed["title"], MAX_TITLE_CHARS)
+    if embed.get("description"):
+        embed["description"] = _truncate(embed["description"], MAX_DESCRIPTION_CHARS)
+    overflow = embed_length(embed) - MAX_CHARS_PER_MESSAGE
+    if overflow > 0 and embed.get("description"):
+        embed["description"] = _truncate(embed["description"], max(1, len(embed["description"]) - overflow))
+    return embed
+
+
+def pack_embeds(embeds: List[Dict[str, Any]], content: str = None) -> List[Dict[str, Any]]:
     """
-    webhook_url = config.DISCORD_WEBHOOK_URL
-    if not webhook_url:
-        print("Discord Webhook URL not set.")
-        return
+    Split embeds into the fewest messages that respect the 10-embed / 6,000-char limits,
+    keeping their order (greedy fill is optimal for an ordered split).
+    `content` goes on the first message only.
+    """
+    messages: List[Dict[str, Any]] = []
+    current: List[Dict[str, Any]] = []
+    chars = 0
+    for embed in embeds:
+        embed = _fit_embed(embed)
+        length = embed_length(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or chars + length > MAX_CHARS_PER_MESSAGE):
+            messages.append({"embeds": current})
+            current, chars = [], 0
+        current.append(embed)
+        chars += length
+    if current:
+        messages.append({"embeds": current})
+
+    if content:
+        content = _truncate(content, MAX_CONTENT_CHARS)
+        if messages:
+            messages[0] = {"content": content, **messages[0]}
+        else:
+            messages.append({"content": content})
+    return messages
+
+
+def build_messages(results: List[AnalysisResult], macro_sentiment: Dict[str, Any] = None,
+                   digest_threshold: int = None) -> List[Dict[str, Any]]:
+    """Full embeds for normal days, a digest above `digest_threshold` results."""
+    if digest_threshold is None:
+        digest_threshold = config.DISCORD_DIGEST_THRESHOLD
+    if len(results) > digest_threshold:
+        payload = format_digest(results, macro_sentiment)
+    else:
+        payload = format_discord_message(results, macro_sentiment)
+    return pack_embeds(payload["embeds"], payload.get("content"))
+
+
+# --- Dispatch ---
+class _Bucket:
+    __slots__ = ("remaining", "reset_at")
+
+    def __init__(self):
+        self.remaining = 1
+        self.reset_at = 0.0
+
+
+class DiscordDispatcher:
+    """
+    Sends webhook messages in order over one pooled HTTP client.
+    Honors Discord's bucket headers (X-RateLimit-Remaining / Reset-After / Bucket),
+    waits `retry_after` on 429 (per-route or global) and backs off on 5xx / network errors.
+    """
+
+    def __init__(self, webhook_url: str = None, max_retries: int = None,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.webhook_url = webhook_url if webhook_url is not None else config.DISCORD_WEBHOOK_URL
+        self.max_retries = max_retries if max_retries is not None else config.DISCORD_MAX_RETRIES
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._buckets: Dict[str, _Bucket] = {}        # bucket id -> state
+        self._route_bucket: Dict[str, str] = {}       # url -> bucket id
+        self._global_reset_at = 0.0
+        self.stats = {"messages": 0, "requests": 0, "rate_limited": 0, "failed": 0}
+
+    def _bind_loop(self):
+        # The pooled client and the lock belong to the event loop that created them;
+        # a later asyncio.run() in the same process gets fresh ones
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = None
+            self._lock = asyncio.Lock()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        self._bind_loop()
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(15.0),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            )
+        return self._client
 
-    async with httpx.AsyncClient() as client:
+    async def aclose(self):
+        """Close the pooled client (waits for an in-flight report to finish)."""
+        self._bind_loop()
+        async with self._lock:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+    async def _wait_for_capacity(self, url: str):
+        now = time.monotonic()
+        wait = self._global_reset_at - now
+        bucket = self._buckets.get(self._route_bucket.get(url, url))
+        if bucket is not None and bucket.remaining <= 0:
+            wait = max(wait, bucket.reset_at - now)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _update_bucket(self, url: str, headers: httpx.Headers):
+        bucket_id = headers.get("x-ratelimit-bucket") or url
+        self._route_bucket[url] = bucket_id
+        bucket = self._buckets.setdefault(bucket_id, _Bucket())
         try:
-            response = await client.post(webhook_url, json=content)
-            response.raise_for_status()
-            print("Notification sent successfully.")
-        except httpx.HTTPError as e:
-            print(f"Failed to send notification: {e}")
+            if "x-ratelimit-remaining" in headers:
+                bucket.remaining = int(headers["x-ratelimit-remaining"])
+            if "x-ratelimit-reset-after" in headers:
+                bucket.reset_at = time.monotonic() + float(headers["x-ratelimit-reset-after"])
+        except ValueError:
+            pass
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Tuple[float, bool]:
+        retry_after, is_global = None, response.headers.get("x-ratelimit-scope") == "global"
+        try:
+            body = response.json()
+            retry_after = body.get("retry_after")
+            is_global = is_global or bool(body.get("global"))
+        except ValueError:
+            pass
+        if retry_after is None:
+            retry_after = response.headers.get("retry-after") or response.headers.get("x-ratelimit-reset-after") or 1
+        return float(retry_after), is_global
+
+    async def send(self, payload: Dict[str, Any]) -> bool:
+        """POST one message; True once Discord accepted it."""
+        url = self.webhook_url
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_capacity(url)
+            self.stats["requests"] += 1
+            try:
+                response = await client.post(url, json=payload)
+            except httpx.HTTPError as e:
+                delay = min(30.0, 2 ** attempt)
+                print(f"Discord request error ({e}); retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                continue
+
+            self._update_bucket(url, response.headers)
+            if response.status_code == 429:
+                self.stats["rate_limited"] += 1
+                retry_after, is_global = self._retry_after(response)
+                if is_global:
+                    self._global_reset_at = time.monotonic() + retry_after
+                else:
+                    bucket = self._buckets[self._route_bucket[url]]
+                    bucket.remaining = 0
+                    bucket.reset_at = time.monotonic() + retry_after
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(min(30.0, 2 ** attempt))
+                continue
+            if response.is_error:
+                print(f"Discord rejected message ({response.status_code}): {response.text[:200]}")
+                break
+            self.stats["messages"] += 1
+            return True
+
+        self.stats["failed"] += 1
+        return False
+
+    async def send_messages(self, messages: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Send in order (messages of one report must not interleave with another)."""
+        if not self.webhook_url:
+            print("Discord Webhook URL not set.")
+            return dict(self.stats)
+        self._bind_loop()
+        async with self._lock:
+            for payload in messages:
+                await self.send(payload)
+        return dict(self.stats)
+
+    async def dispatch(self, results: List[AnalysisResult], macro_sentiment: Dict[str, Any] = None) -> Dict[str, int]:
+        messages = build_messages(results, macro_sentiment)
+        mode = "digest" if len(results) > config.DISCORD_DIGEST_THRESHOLD else "full"
+        print(f"Dispatching {len(results)} results as {len(messages)} Discord messages ({mode})...")
+        return await self.send_messages(messages)
+
+
+dispatcher = DiscordDispatcher()
+
+
+async def send_notification(content: Dict[str, Any]):
+    """
+    Send notification to Discord webhook.
+    Oversized payloads are split into several compliant messages.
+    """
+    messages = pack_embeds(content.get("embeds") or [], content.get("content"))
+    before = dict(dispatcher.stats)
+    try:
+        stats = await dispatcher.send_messages(messages)
+    finally:
+        # One-shot callers wrap this in asyncio.run(): do not leave the client open
+        await dispatcher.aclose()
+    if stats["failed"] > before["failed"]:
+        print(f"Failed to send notification ({stats['failed'] - before['failed']} messages).")
+    elif dispatcher.webhook_url:
+        print("Notification sent successfully.")
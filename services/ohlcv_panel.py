@@ -0,0 +1,199 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# OHLCV panel shared between processes without copying:
+#   one float64 block shaped (fields, dates, tickers) in multiprocessing.shared_memory
+#   (or a memory-mapped file when `path` is given), plus a small picklable handle
+#   (block name, shape, ticker / date / field labels).
+# Workers attach with the handle and get read-only NumPy views, so the fan-out cost
+# is the size of the index, not of the data, and the data exists once in memory.
+FIELDS = ["open", "high", "low", "close", "volume"]
+DTYPE = "float64"
+
+
+def _attach_shared_memory(name: str):
+    from multiprocessing import shared_memory
+
+    try:
+        # Python 3.13+: attaching processes must not unlink the block on exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions register the attach too; pool workers share the creator's
+        # resource tracker, so that is the same (idempotent) registration
+        return shared_memory.SharedMemory(name=name)
+
+
+class OHLCVPanel:
+    """
+    (fields x dates x tickers) values, NaN where a ticker has no bar.
+    `field("close")` is a (dates x tickers) view; `series(ticker)` a strided column view.
+    """
+
+    def __init__(self, values, tickers: List[str], dates: List[str], fields: List[str],
+                 handle: Dict[str, Any], shm=None, owner: bool = False):
+        self.values = values
+        self.tickers = tickers
+        self.dates = dates
+        self.fields = fields
+        self.handle = handle
+        self.ticker_index = {t: i for i, t in enumerate(tickers)}
+        self.date_index = {d: i for i, d in enumerate(dates)}
+        self.field_index = {f: i for i, f in enumerate(fields)}
+        self._shm = shm
+        self._owner = owner
+
+    @classmethod
+    def create(cls, tickers: List[str], dates: List[str], fields: List[str] = None, path: str = None) -> "OHLCVPanel":
+        """Writable, NaN-filled panel owned by this process (call unlink() when done)."""
+        import numpy as np
+
+        fields = list(fields or FIELDS)
+        shape = (len(fields), len(dates), len(tickers))
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(DTYPE).itemsize)
+        handle = {"shape": shape, "dtype": DTYPE, "tickers": list(tickers), "dates": list(dates), "fields": fields}
+        shm = None
+        if path:
+            values = np.lib.format.open_memmap(path, mode="w+", dtype=DTYPE, shape=shape)
+            handle["path"] = os.path.abspath(path)
+        else:
+            from multiprocessing import shared_memory
+
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            values = np.ndarray(shape, dtype=DTYPE, buffer=shm.buf)
+            handle["name"] = shm.name
+        values.fill(np.nan)
+        return cls(values, handle["tickers"], handle["dates"], fields, handle, shm, owner=True)
+
+    @classmethod
+    def attach(cls, handle: Dict[str, Any]) -> "OHLCVPanel":
+        """Read-only view of a panel created by another process."""
+        import numpy as np
+
+        shm = None
+        if "path" in handle:
+            values = np.load(handle["path"], mmap_mode="r")
+        else:
+            shm = _attach_shared_memory(handle["name"])
+            values = np.ndarray(tuple(handle["shape"]), dtype=handle["dtype"], buffer=shm.buf)
+            values.flags.writeable = False
+        return cls(values, handle["tickers"], handle["dates"], handle["fields"], handle, shm)
+
+    # --- Views ---
+    def field(self, name: str):
+        return self.values[self.field_index[name]]
+
+    def series(self, ticker: str, field: str = "close"):
+        return self.values[self.field_index[field], :, self.ticker_index[ticker]]
+
+    def columns(self, tickers: Iterable[str]) -> List[int]:
+        return [self.ticker_index[t] for t in tickers]
+
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    # --- Lifetime ---
+    def close(self):
+        # Views must be dropped before the buffer can be released
+        self.values = None
+        if self._shm is not None:
+            self._shm.close()
+
+    def unlink(self):
+        """Owner only: free the shared block (or memory-mapped file) for every process."""
+        shm, path = self._shm, self.handle.get("path")
+        self.close()
+        if self._owner:
+            if shm is not None:
+                shm.unlink()
+            elif path and os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+
+def from_frames(frames: Dict[str, Any], fields: List[str] = None, path: str = None) -> OHLCVPanel:
+    """
+    Panel from per-ticker DataFrames (Open/High/Low/Close/Volume columns, date index),
+    e.g. the fetch planner's cache. Dates are the union of every frame's dates.
+    """
+    import pandas as pd
+
+    fields = list(fields or FIELDS)
+    tickers = sorted(frames)
+    indexes = {t: pd.DatetimeIndex(frames[t].index).normalize() for t in tickers}
+    index = pd.DatetimeIndex([])
+    for ticker_index in indexes.values():
+        # Universe frames usually share one calendar: skip the union when nothing is new
+        if not ticker_index.equals(index):
+            index = index.union(ticker_index)
+    panel = OHLCVPanel.create(tickers, list(index.strftime("%Y-%m-%d")), fields, path)
+    try:
+        for col, ticker in enumerate(tickers):
+            df = frames[ticker]
+            rows = slice(None) if indexes[ticker].equals(index) else index.get_indexer(indexes[ticker])
+            present = [(f, name.capitalize()) for f, name in enumerate(fields) if name.capitalize() in df]
+            if not present:
+                continue
+            block = df[[source for _, source in present]].to_numpy(dtype=DTYPE, na_value=float("nan"))
+            for i, (f, _) in enumerate(present):
+                panel.values[f, rows, col] = block[:, i]
+    except Exception:
+        panel.unlink()
+        raise
+    return panel
+
+
+def from_archive(start: str = None, end: str = None, base_dir: str = None, path: str = None) -> OHLCVPanel:
+    """Panel of the archived daily bars (services/archive.py OHLCV table) over [start, end]."""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from services import archive
+
+    table = archive.read(start, end, base_dir=base_dir, table=archive.OHLCV)
+    tickers_col = table["ticker"].cast(pa.string())
+    dates_col = table["date"].cast(pa.string())
+    tickers = sorted(pc.unique(tickers_col).to_pylist())
+    dates = sorted(pc.unique(dates_col).to_pylist())
+    panel = OHLCVPanel.create(tickers, dates, FIELDS, path)
+    try:
+        cols = pc.index_in(tickers_col, value_set=pa.array(tickers)).to_numpy(zero_copy_only=False)
+        rows = pc.index_in(dates_col, value_set=pa.array(dates)).to_numpy(zero_copy_only=False)
+        for f, name in enumerate(FIELDS):
+            panel.values[f, rows, cols] = table[name].cast(pa.float64()).to_numpy(zero_copy_only=False).astype(np.float64)
+    except Exception:
+        panel.unlink()
+        raise
+    return panel
+
+
+# --- Worker fan-out ---
+_worker_panel: Optional[OHLCVPanel] = None
+
+
+def _init_worker(handle: Dict[str, Any]):
+    global _worker_panel
+    _worker_panel = OHLCVPanel.attach(handle)
+
+
+def _run_task(func: Callable, task: Any):
+    return func(_worker_panel, task)
+
+
+def map_panel(func: Callable[[OHLCVPanel, Any], Any], panel: OHLCVPanel, tasks: Iterable[Any],
+              processes: int = None) -> List[Any]:
+    """
+    [func(panel, task) for task in tasks] on a process pool. Each worker attaches to the
+    panel once; only the handle and the (small) tasks are pickled. `func` must be a
+    module-level function.
+    """
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(panel.handle,)) as pool:
+        return list(pool.map(_run_task, [func] * len(tasks := list(tasks)), tasks))
@@ -0,0 +1,54 @@
+from typing import Any, Dict, List
+
+import pandas as pd
+
+# Columns of sector_daily_log (besides date / sector)
+SECTOR_METRICS = [
+    "stock_count",
+    "buy_count",
+    "aggressive_count",
+    "wait_count",
+    "avg_rsi",
+    "above_sma75_ratio",
+    "avg_correlation_us",
+    "avg_upside_ratio",
+    "macro_score",
+]
+
+
+def compute_sector_aggregates(target_date: str, rows: List[Dict[str, Any]], above_sma75: Dict[str, bool]) -> List[Dict[str, Any]]:
+    """
+    Per-sector aggregates of one day's analysis rows (single groupby, no per-row loop).
+    above_sma75: {ticker: Close > SMA75} collected during the technical pass.
+    """
+    if not rows:
+        return []
+
+    df = pd.DataFrame(rows, columns=["ticker", "sector", "signal", "rsi_14", "correlation_us", "upside_ratio", "macro_score"])
+    df["sector"] = df["sector"].fillna("").replace("", "Unknown")
+    df["above_sma75"] = df["ticker"].map(above_sma75).fillna(False).astype(float)
+    df["is_buy"] = (df["signal"] == "BUY").astype(int)
+    df["is_aggressive"] = (df["signal"] == "AGGRESSIVE").astype(int)
+    df["is_wait"] = (df["signal"] == "WAIT").astype(int)
+
+    agg = df.groupby("sector").agg(
+        stock_count=("ticker", "size"),
+        buy_count=("is_buy", "sum"),
+        aggressive_count=("is_aggressive", "sum"),
+        wait_count=("is_wait", "sum"),
+        avg_rsi=("rsi_14", "mean"),
+        above_sma75_ratio=("above_sma75", "mean"),
+        avg_correlation_us=("correlation_us", "mean"),
+        avg_upside_ratio=("upside_ratio", "mean"),
+        macro_score=("macro_score", "first"),  # Same category score for every stock of the sector
+    ).reset_index()
+
+    records = []
+    for rec in agg.to_dict("records"):
+        record = {"date": target_date, "sector": rec["sector"]}
+        for col in ["stock_count", "buy_count", "aggressive_count", "wait_count", "macro_score"]:
+            record[col] = int(rec[col]) if pd.notna(rec[col]) else None
+        for col in ["avg_rsi", "above_sma75_ratio", "avg_correlation_us", "avg_upside_ratio"]:
+            record[col] = round(float(rec[col]), 4) if pd.notna(rec[col]) else None
+        records.append(record)
+    return records
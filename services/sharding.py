@@ -0,0 +1,182 @@
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import config
+from services.db_client import fetch_all, MAX_ROWS_PER_REQUEST
+
+# Universe sharding for the daily batch:
+#   plan   (once)       macro stage + cost-balanced partition -> <SHARD_DIR>/<date>/plan.json
+#   shard  (i of N)     technical analysis + deep dives       -> <SHARD_DIR>/<date>/part-<i>-of-<N>.json
+#   merge  (once)       completeness check, then DB upserts / snapshots
+
+# Expected wall time per ticker (seconds). Deep dives (scrape + LLM + polite sleep)
+# dominate, so shards are balanced by how often a ticker produced a signal recently.
+BASE_COST = 0.5
+DEEP_DIVE_COST = 8.0
+HISTORY_DAYS = 20
+PRIOR_WEIGHT = 5.0        # Pseudo-days of the universe-wide rate mixed into each ticker's rate
+DEFAULT_SIGNAL_RATE = 0.05
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """'i/N' (1-based) -> (i, N)."""
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}' (expected i/N, e.g. 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{value}' (need 1 <= i <= N)")
+    return index, count
+
+
+def fetch_signal_counts(supabase, target_date: str, days: int = HISTORY_DAYS, page_size: int = MAX_ROWS_PER_REQUEST):
+    """
+    Deep-dive signals per ticker over the last `days` calendar days (one paged query).
+    Returns ({ticker: count}, number of analysis dates seen).
+    """
+    from services.snapshot import RECOMMEND_SIGNALS
+
+    start = (datetime.strptime(target_date, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = fetch_all(lambda: (
+        supabase.table("market_analysis_log")
+        .select("date, ticker")
+        .gte("date", start)
+        .lt("date", target_date)
+        .in_("signal", RECOMMEND_SIGNALS)
+        .order("date")
+        .order("ticker")
+    ), page_size)
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row["ticker"]] = counts.get(row["ticker"], 0) + 1
+    return counts, len({row["date"] for row in rows})
+
+
+def estimate_costs(tickers: List[str], signal_counts: Dict[str, int], observed_days: int,
+                   universe_size: int = None) -> Dict[str, float]:
+    """Expected seconds per ticker: base + P(deep dive) x deep-dive cost (smoothed signal rate)."""
+    universe_size = universe_size or len(tickers) or 1
+    if observed_days:
+        global_rate = sum(signal_counts.values()) / (observed_days * universe_size)
+    else:
+        global_rate = DEFAULT_SIGNAL_RATE
+    costs = {}
+    for ticker in tickers:
+        rate = (signal_counts.get(ticker, 0) + PRIOR_WEIGHT * global_rate) / (observed_days + PRIOR_WEIGHT)
+        costs[ticker] = round(BASE_COST + min(1.0, rate) * DEEP_DIVE_COST, 4)
+    return costs
+
+
+def partition(costs: Dict[str, float], count: int) -> List[List[str]]:
+    """
+    Deterministic longest-processing-time split: heaviest ticker first onto the least
+    loaded shard (ties by ticker / shard index). Same input -> same shards on any machine.
+    """
+    shards: List[List[str]] = [[] for _ in range(count)]
+    heap = [(0.0, i) for i in range(count)]
+    for ticker, cost in sorted(costs.items(), key=lambda kv: (-kv[1], kv[0])):
+        load, i = heapq.heappop(heap)
+        shards[i].append(ticker)
+        heapq.heappush(heap, (round(load + cost, 6), i))
+    return [sorted(s) for s in shards]
+
+
+# --- Files ---
+def shard_dir(target_date: str, base_dir: str = None) -> str:
+    return os.path.join(base_dir or config.SHARD_DIR, target_date)
+
+
+def plan_path(target_date: str, base_dir: str = None) -> str:
+    return os.path.join(shard_dir(target_date, base_dir), "plan.json")
+
+
+def part_path(target_date: str, index: int, count: int, base_dir: str = None) -> str:
+    return os.path.join(shard_dir(target_date, base_dir), f"part-{index}-of-{count}.json")
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_plan(target_date: str, shards: List[List[str]], costs: Dict[str, float],
+               macro: Dict[str, Any], base_dir: str = None, run_at: datetime = None) -> str:
+    """run_at: end of the market-data windows; every shard of the run uses the same one."""
+    path = plan_path(target_date, base_dir)
+    _write_json(path, {
+        "date": target_date,
+        "created_at": datetime.now().isoformat(),
+        "run_at": (run_at or datetime.now()).isoformat(),
+        "shard_count": len(shards),
+        "shards": shards,
+        "expected_cost": [round(sum(costs[t] for t in s), 1) for s in shards],
+        "macro": macro,
+    })
+    return path
+
+
+def read_plan(target_date: str, base_dir: str = None) -> Optional[Dict[str, Any]]:
+    return _read_json(plan_path(target_date, base_dir))
+
+
+def write_part(target_date: str, index: int, count: int, tickers: List[str], rows: List[Dict[str, Any]],
+               above_sma75: Dict[str, bool], failed: Dict[str, str], elapsed: float, base_dir: str = None) -> str:
+    path = part_path(target_date, index, count, base_dir)
+    _write_json(path, {
+        "date": target_date,
+        "shard": index,
+        "shard_count": count,
+        "tickers": tickers,
+        "rows": rows,
+        "above_sma75": above_sma75,
+        "failed": failed,
+        "elapsed": round(elapsed, 1),
+        "status": "complete",
+    })
+    return path
+
+
+def load_parts(plan: Dict[str, Any], base_dir: str = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Read and validate every part of a plan.
+    Returns (parts, problems); merge must not upsert while problems is non-empty.
+    """
+    target_date, count = plan["date"], plan["shard_count"]
+    parts, problems = [], []
+    seen: Dict[str, int] = {}
+    for index in range(1, count + 1):
+        part = _read_json(part_path(target_date, index, count, base_dir))
+        if part is None:
+            problems.append(f"shard {index}/{count}: part file missing")
+            continue
+        if part.get("status") != "complete" or part.get("date") != target_date:
+            problems.append(f"shard {index}/{count}: incomplete or for another date")
+            continue
+        assigned = set(plan["shards"][index - 1])
+        if set(part["tickers"]) != assigned:
+            problems.append(f"shard {index}/{count}: ticker list differs from the plan")
+            continue
+        for row in part["rows"]:
+            ticker = row.get("ticker")
+            if ticker not in assigned or row.get("date") != target_date:
+                problems.append(f"shard {index}/{count}: unexpected row {ticker} ({row.get('date')})")
+            elif ticker in seen:
+                problems.append(f"shard {index}/{count}: duplicate row {ticker} (also in shard {seen[ticker]})")
+            else:
+                seen[ticker] = index
+        parts.append(part)
+    return parts, problems
@@ -0,0 +1,130 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import config
+
+try:
+    import fcntl  # Serializes concurrent publishers (batch + intraday loop)
+except ImportError:
+    fcntl = None
+
+# Every event gets a monotonically increasing `id` and is appended to the event log
+# (JSON lines, trimmed to the last EVENT_LOG_KEEP entries). The stamp file at
+# ANALYSIS_SIGNAL_PATH holds the last event: its mtime is the cheap change token.
+EVENT_LOG_KEEP = 200
+
+
+def _log_path(path: str = None) -> str:
+    return f"{path or config.ANALYSIS_SIGNAL_PATH}.log"
+
+
+@contextmanager
+def _locked(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_log(path: str = None) -> List[Dict[str, Any]]:
+    events = []
+    try:
+        with open(_log_path(path), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn line from a crashed writer
+    except OSError:
+        pass
+    return events
+
+
+def publish_analysis_update(target_date: str, kind: str = "analysis", details: Dict[str, Any] = None):
+    """
+    Signal API processes on this machine that new results have been written.
+    Appends the event to the event log and rewrites the stamp file; readers only
+    need an os.stat() to detect changes.
+    kind: "analysis" (market_analysis_log), "macro" (daily_macro_log) or "intraday"
+    """
+    path = config.ANALYSIS_SIGNAL_PATH
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _locked(path):
+            events = _read_log(path)
+            last = read_signal_event(path) or {}
+            # The stamp keeps the sequence going if the log was removed
+            last_id = max([event_id(e) for e in events[-1:]] + [event_id(last)])
+            event = {"id": last_id + 1, "type": kind, "date": target_date, "published_at": datetime.now().isoformat()}
+            event.update(details or {})
+            line = json.dumps(event, ensure_ascii=False) + "\n"
+            if len(events) >= 2 * EVENT_LOG_KEEP:
+                # Trim: rewrite the tail atomically (watchers re-read by id, not by offset)
+                keep = [json.dumps(e, ensure_ascii=False) + "\n" for e in events[-EVENT_LOG_KEEP:]]
+                tmp_log = f"{_log_path(path)}.tmp"
+                with open(tmp_log, "w", encoding="utf-8") as f:
+                    f.writelines(keep + [line])
+                os.replace(tmp_log, _log_path(path))
+            else:
+                with open(_log_path(path), "a", encoding="utf-8") as f:
+                    f.write(line)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(event, f, ensure_ascii=False)
+            os.replace(tmp_path, path)  # Atomic swap so readers never see a partial file
+    except OSError as e:
+        print(f"    Signal Warning: could not publish analysis update ({e})")
+
+
+def event_id(event: Optional[Dict[str, Any]]) -> int:
+    """Sequence id of an event (0 for events written before ids existed)."""
+    try:
+        return int((event or {}).get("id") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def read_events(after_id: int = 0, path: str = None) -> List[Dict[str, Any]]:
+    """Logged events with id > after_id, oldest first."""
+    return [e for e in _read_log(path) if event_id(e) > after_id]
+
+
+def latest_events(path: str = None) -> List[Dict[str, Any]]:
+    """The most recent event of each kind, oldest first (the state a new client starts from)."""
+    by_kind: Dict[str, Dict[str, Any]] = {}
+    for event in _read_log(path):
+        by_kind[event.get("type", "message")] = event
+    if not by_kind:
+        # No log yet: fall back to the stamp file
+        last = read_signal_event(path)
+        return [last] if last else []
+    return sorted(by_kind.values(), key=event_id)
+
+
+def read_signal_event(path: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Return the last published event, or None if absent / unreadable.
+    """
+    try:
+        with open(path or config.ANALYSIS_SIGNAL_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_signal_version(path: str = None):
+    """
+    Return a cheap change token (mtime_ns) for the signal file, or None if absent.
+    """
+    try:
+        return os.stat(path or config.ANALYSIS_SIGNAL_PATH).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from services.db_client import supabase
+
+# Rows of the `latest_snapshot` table (one indexed read per "latest" endpoint)
+ANALYSIS_DATE = "analysis_date"          # Pointer to the current analysis date (no payload)
+ANALYSIS_ALL = "analysis_all"            # All rows of the latest date, ordered by ticker
+ANALYSIS_RECOMMEND = "analysis_recommend"  # BUY/AGGRESSIVE rows, ordered like /api/recommendations
+MACRO = "macro"                          # Latest daily_macro_log record
+
+RECOMMEND_SIGNALS = ["BUY", "AGGRESSIVE"]
+
+
+def sort_recommendations(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Same ordering as the DB query: trend_strength DESC, upside_ratio DESC.
+    """
+    return sorted(
+        rows,
+        key=lambda r: (r.get("trend_strength") or "", r.get("upside_ratio") or 0.0),
+        reverse=True,
+    )
+
+
+def read_snapshot(name: str, columns: str = "date, payload") -> Optional[Dict[str, Any]]:
+    """
+    Single primary-key read of a snapshot row. Returns None if it has not been published yet.
+    """
+    res = supabase.table("latest_snapshot").select(columns).eq("name", name).limit(1).execute()
+    return res.data[0] if res.data else None
+
+
+def publish_snapshot(name: str, target_date: str, payload: Any = None) -> bool:
+    """
+    Upsert a snapshot row unless a newer date is already published
+    (historical --date reruns must not roll the "latest" view back).
+    """
+    current = read_snapshot(name, columns="date")
+    if current and current["date"] and str(current["date"]) > target_date:
+        print(f"    Snapshot '{name}' already at {current['date']}; skipping {target_date}.")
+        return False
+
+    supabase.table("latest_snapshot").upsert({
+        "name": name,
+        "date": target_date,
+        "payload": payload,
+        "updated_at": datetime.now().isoformat(),
+    }).execute()
+    return True
+
+
+def recommendation_diff(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compact diff of two recommendation lists (tickers added / removed / signal changed).
+    """
+    prev_signals = {r["ticker"]: r.get("signal") for r in previous}
+    curr_signals = {r["ticker"]: r.get("signal") for r in current}
+    return {
+        "added": sorted(t for t in curr_signals if t not in prev_signals),
+        "removed": sorted(t for t in prev_signals if t not in curr_signals),
+        "changed": sorted(
+            t for t in curr_signals if t in prev_signals and curr_signals[t] != prev_signals[t]
+        ),
+        "count": len(curr_signals),
+    }
+
+
+def publish_analysis_snapshot(target_date: str, rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Publish all/recommend views of a completed analysis date, then move the date pointer.
+    Returns the recommendation diff against the previously published list
+    (None if a newer date is already published).
+    """
+    all_rows = sorted(rows, key=lambda r: r["ticker"])
+    recommend_rows = sort_recommendations([r for r in rows if r.get("signal") in RECOMMEND_SIGNALS])
+
+    previous = read_snapshot(ANALYSIS_RECOMMEND)
+    if not publish_snapshot(ANALYSIS_ALL, target_date, all_rows):
+        return None
+    publish_snapshot(ANALYSIS_RECOMMEND, target_date, recommend_rows)
+    # Pointer last: readers switch dates only after the payloads exist
+    publish_snapshot(ANALYSIS_DATE, target_date)
+
+    previous_rows = (previous or {}).get("payload") or []
+    diff = recommendation_diff(previous_rows, recommend_rows)
+    diff["previous_date"] = (previous or {}).get("date")
+    return diff
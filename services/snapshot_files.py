@@ -0,0 +1,164 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import config
+from services.snapshot import RECOMMEND_SIGNALS, sort_recommendations
+
+try:
+    import orjson  # Fast encoder; output matches the API's compact UTF-8 JSON
+except ImportError:
+    orjson = None
+
+# Static, pre-serialized API responses written by the batch:
+#   <SNAPSHOT_DIR>/<date>/manifest.json          files + version of that date
+#   <SNAPSHOT_DIR>/<date>/<name>.json.gz         response bodies (gzip)
+#   <SNAPSHOT_DIR>/current.json                  {"analysis_date": ..., "macro_date": ...}
+LATEST_ALL = "latest_all"
+LATEST_RECOMMEND = "latest_recommend"
+RECOMMENDATIONS = "recommendations"
+MACRO = "macro"
+POINTER_FILE = "current.json"
+
+
+def enabled() -> bool:
+    return bool(config.SNAPSHOT_DIR)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sector_name(sector: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", sector).strip("-").lower()
+    return f"sector-{slug or 'unknown'}"
+
+
+# --- Response bodies (shared with app/main.py so both paths serve identical bytes) ---
+def build_latest_content(target_date: str, mode: str, stocks: List[Dict[str, Any]], sector: str = None) -> Dict[str, Any]:
+    content = {"status": "success", "date": target_date, "mode": mode}
+    if sector:
+        content["sector"] = sector
+    content["count"] = len(stocks)
+    content["stocks"] = stocks
+    return content
+
+
+def build_recommendations_content(target_date: str, stocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"status": "success", "date": target_date, "stocks": stocks}
+
+
+def build_macro_content(record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"data": record}
+
+
+# --- Writer (batch) ---
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_files(target_date: str, bodies: Dict[str, Any], extra: Dict[str, Any] = None) -> Dict[str, Any]:
+    date_dir = os.path.join(config.SNAPSHOT_DIR, target_date)
+    os.makedirs(date_dir, exist_ok=True)
+
+    manifest_path = os.path.join(date_dir, "manifest.json")
+    manifest = _read_json(manifest_path) or {"date": target_date, "files": {}}
+    for name, content in bodies.items():
+        raw = dumps(content)
+        data = gzip.compress(raw, compresslevel=9, mtime=0)
+        _write_atomic(os.path.join(date_dir, f"{name}.json.gz"), data)
+        manifest["files"][name] = {"size": len(raw), "gzip_size": len(data)}
+    manifest.update(extra or {})
+    manifest["version"] = datetime.now().strftime("%Y%m%d%H%M%S")
+    _write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _update_pointer(key: str, target_date: str) -> bool:
+    """Move current.json forward (never back to an older --date rerun)."""
+    path = os.path.join(config.SNAPSHOT_DIR, POINTER_FILE)
+    pointer = _read_json(path) or {}
+    if pointer.get(key) and pointer[key] > target_date:
+        return False
+    pointer[key] = target_date
+    _write_atomic(path, json.dumps(pointer).encode("utf-8"))
+    return True
+
+
+def write_analysis_snapshot(target_date: str, rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Write all / recommend / per-sector response bodies for a completed date.
+    """
+    if not enabled():
+        return None
+    all_rows = sorted(rows, key=lambda r: r["ticker"])
+    recommend_rows = sort_recommendations([r for r in rows if r.get("signal") in RECOMMEND_SIGNALS])
+
+    bodies = {
+        LATEST_ALL: build_latest_content(target_date, "all", all_rows),
+        LATEST_RECOMMEND: build_latest_content(target_date, "recommend", recommend_rows),
+        RECOMMENDATIONS: build_recommendations_content(target_date, recommend_rows),
+    }
+    sectors: Dict[str, List[Dict[str, Any]]] = {}
+    for row in all_rows:
+        sectors.setdefault(row.get("sector") or "", []).append(row)
+    sector_files = {}
+    for sector, sector_rows in sectors.items():
+        if not sector:
+            continue
+        name = sector_name(sector)
+        bodies[name] = build_latest_content(target_date, "all", sector_rows, sector=sector)
+        sector_files[sector] = name
+
+    manifest = _write_files(target_date, bodies, extra={"sectors": sector_files})
+    _update_pointer("analysis_date", target_date)
+    return manifest
+
+
+def write_macro_snapshot(target_date: str, record: Dict[str, Any]):
+    if not enabled():
+        return None
+    manifest = _write_files(target_date, {MACRO: build_macro_content(record)})
+    _update_pointer("macro_date", target_date)
+    return manifest
+
+
+# --- Reader (API) ---
+def read_pointer() -> Dict[str, Any]:
+    if not enabled():
+        return {}
+    return _read_json(os.path.join(config.SNAPSHOT_DIR, POINTER_FILE)) or {}
+
+
+def resolve_sector_file(target_date: str, sector: str) -> Optional[str]:
+    manifest = _read_json(os.path.join(config.SNAPSHOT_DIR, target_date, "manifest.json")) or {}
+    return manifest.get("sectors", {}).get(sector)
+
+
+def read_gzip(target_date: str, name: str) -> Optional[bytes]:
+    """
+    Raw gzip bytes of a pre-serialized response, or None if it was not written.
+    """
+    if not enabled() or not target_date:
+        return None
+    try:
+        with open(os.path.join(config.SNAPSHOT_DIR, target_date, f"{name}.json.gz"), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
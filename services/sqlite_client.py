@@ -0,0 +1,354 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+# Local stand-in for the Supabase tables used by the batch and the API.
+# Column types: TEXT / REAL / INTEGER are stored natively, JSON is stored as text
+# and decoded on read (mirrors jsonb columns on the Supabase side).
+TABLE_SCHEMAS = {
+    "market_analysis_log": {
+        "columns": {
+            "date": "TEXT",
+            "ticker": "TEXT",
+            "sector": "TEXT",
+            "name_jp": "TEXT",
+            "name_en": "TEXT",
+            "close_price": "REAL",
+            "rsi_14": "REAL",
+            "atr_14": "REAL",
+            "upside_ratio": "REAL",
+            "macro_score": "INTEGER",
+            "signal": "TEXT",
+            "trend_strength": "TEXT",
+            "correlation_us": "REAL",
+            "exit_guideline": "TEXT",
+            "performance_summary": "TEXT",
+            "earnings_release_date": "TEXT",
+            "reason": "TEXT",
+            "content_hash": "TEXT",
+        },
+        "primary_key": ["date", "ticker"],
+        "indexes": [["date", "signal"], ["ticker", "date"]],
+    },
+    "daily_macro_log": {
+        "columns": {
+            "date": "TEXT",
+            "summary": "TEXT",
+            "sector_scores": "JSON",
+            "risk_events": "JSON",
+            "usd_jpy": "REAL",
+            "sox_index": "REAL",
+            "nasdaq_index": "REAL",
+        },
+        "primary_key": ["date"],
+        "indexes": [],
+    },
+    "sector_daily_log": {
+        "columns": {
+            "date": "TEXT",
+            "sector": "TEXT",
+            "stock_count": "INTEGER",
+            "buy_count": "INTEGER",
+            "aggressive_count": "INTEGER",
+            "wait_count": "INTEGER",
+            "avg_rsi": "REAL",
+            "above_sma75_ratio": "REAL",
+            "avg_correlation_us": "REAL",
+            "avg_upside_ratio": "REAL",
+            "macro_score": "INTEGER",
+        },
+        "primary_key": ["date", "sector"],
+        "indexes": [],
+    },
+    "latest_snapshot": {
+        "columns": {
+            "name": "TEXT",
+            "date": "TEXT",
+            "payload": "JSON",
+            "updated_at": "TEXT",
+        },
+        "primary_key": ["name"],
+        "indexes": [],
+    },
+    "batch_stage_log": {
+        "columns": {
+            "date": "TEXT",
+            "stage": "TEXT",
+            "status": "TEXT",
+            "fingerprint": "TEXT",
+            "output": "JSON",
+            "completed_at": "TEXT",
+        },
+        "primary_key": ["date", "stage"],
+        "indexes": [],
+    },
+    "llm_usage_log": {
+        "columns": {
+            "date": "TEXT",
+            "run_id": "TEXT",
+            "requests": "INTEGER",
+            "prompt_tokens": "INTEGER",
+            "output_tokens": "INTEGER",
+            "rate_limited": "INTEGER",
+            "summary": "JSON",
+        },
+        "primary_key": ["date", "run_id"],
+        "indexes": [],
+    },
+}
+
+
+class SQLiteAPIError(Exception):
+    """Raised for invalid queries (unknown table/column), like postgrest's APIError."""
+
+
+class SQLiteResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.count = len(data)
+
+
+class SQLiteQuery:
+    """
+    Subset of the supabase-py query builder:
+    select / upsert / eq / neq / gt / gte / lt / lte / in_ / order / limit / range / execute
+    """
+
+    def __init__(self, client: "SQLiteClient", table: str):
+        if table not in TABLE_SCHEMAS:
+            raise SQLiteAPIError(f"Unknown table: {table}")
+        self._client = client
+        self._table = table
+        self._schema = TABLE_SCHEMAS[table]
+        self._op = None
+        self._columns: List[str] = []
+        self._rows: List[Dict[str, Any]] = []
+        self._filters: List[tuple] = []
+        self._orders: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset: int = 0
+
+    # --- Operations ---
+    def select(self, columns: str = "*"):
+        self._op = "select"
+        if columns.strip() == "*":
+            self._columns = list(self._schema["columns"])
+        else:
+            self._columns = [c.strip() for c in columns.split(",") if c.strip()]
+            for col in self._columns:
+                self._check_column(col)
+        return self
+
+    def upsert(self, data, on_conflict: str = None):
+        self._op = "upsert"
+        self._rows = [data] if isinstance(data, dict) else list(data)
+        if on_conflict:
+            self._conflict = [c.strip() for c in on_conflict.split(",")]
+        else:
+            self._conflict = list(self._schema["primary_key"])
+        return self
+
+    # --- Filters ---
+    def _filter(self, column: str, op: str, value):
+        self._check_column(column)
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column: str, values):
+        return self._filter(column, "IN", list(values))
+
+    def order(self, column: str, desc: bool = False):
+        self._check_column(column)
+        self._orders.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int):
+        # Inclusive bounds like PostgREST
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # --- Execution ---
+    def execute(self) -> SQLiteResponse:
+        if self._op == "select":
+            return self._execute_select()
+        if self._op == "upsert":
+            return self._execute_upsert()
+        raise SQLiteAPIError("Query has no operation (call select() or upsert() first)")
+
+    def _check_column(self, column: str):
+        if column not in self._schema["columns"]:
+            raise SQLiteAPIError(f"column {self._table}.{column} does not exist")
+
+    def _where_clause(self):
+        clauses, params = [], []
+        for column, op, value in self._filters:
+            if op == "IN":
+                if not value:
+                    # Postgres: `col IN ()` matches nothing
+                    clauses.append("0")
+                    continue
+                clauses.append(f'"{column}" IN ({", ".join("?" for _ in value)})')
+                params.extend(value)
+            elif value is None and op in ("=", "!="):
+                clauses.append(f'"{column}" IS {"NOT " if op == "!=" else ""}NULL')
+            else:
+                clauses.append(f'"{column}" {op} ?')
+                params.append(value)
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def _execute_select(self) -> SQLiteResponse:
+        cols = ", ".join(f'"{c}"' for c in self._columns)
+        sql = f'SELECT {cols} FROM "{self._table}"'
+        where, params = self._where_clause()
+        sql += where
+        if self._orders:
+            # Postgres defaults: NULLS LAST for ASC, NULLS FIRST for DESC
+            parts = [
+                f'"{c}" DESC NULLS FIRST' if desc else f'"{c}" ASC NULLS LAST'
+                for c, desc in self._orders
+            ]
+            sql += " ORDER BY " + ", ".join(parts)
+        if self._limit is not None or self._offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([self._limit if self._limit is not None else -1, self._offset])
+
+        cur = self._client.connection().execute(sql, params)
+        types = self._schema["columns"]
+        data = []
+        for raw in cur.fetchall():
+            row = {}
+            for col, value in zip(self._columns, raw):
+                if types[col] == "JSON" and value is not None:
+                    value = json.loads(value)
+                row[col] = value
+            data.append(row)
+        return SQLiteResponse(data)
+
+    def _execute_upsert(self) -> SQLiteResponse:
+        if not self._rows:
+            return SQLiteResponse([])
+        types = self._schema["columns"]
+        conn = self._client.connection()
+
+        # Rows may carry different key sets; group them so each group is one executemany
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in self._rows:
+            for col in row:
+                self._check_column(col)
+            groups.setdefault(tuple(row.keys()), []).append(row)
+
+        with conn:
+            for cols, rows in groups.items():
+                missing = [c for c in self._conflict if c not in cols]
+                if missing:
+                    raise SQLiteAPIError(f"upsert rows missing conflict columns: {missing}")
+                col_sql = ", ".join(f'"{c}"' for c in cols)
+                placeholders = ", ".join("?" for _ in cols)
+                updates = [c for c in cols if c not in self._conflict]
+                conflict_sql = ", ".join(f'"{c}"' for c in self._conflict)
+                if updates:
+                    set_sql = ", ".join(f'"{c}" = excluded."{c}"' for c in updates)
+                    action = f"DO UPDATE SET {set_sql}"
+                else:
+                    action = "DO NOTHING"
+                sql = (
+                    f'INSERT INTO "{self._table}" ({col_sql}) VALUES ({placeholders}) '
+                    f"ON CONFLICT ({conflict_sql}) {action}"
+                )
+                params = [
+                    [
+                        json.dumps(row[c], ensure_ascii=False) if types[c] == "JSON" and row[c] is not None else row[c]
+                        for c in cols
+                    ]
+                    for row in rows
+                ]
+                conn.executemany(sql, params)
+        return SQLiteResponse(list(self._rows))
+
+
+class SQLiteClient:
+    """
+    Embedded SQLite backend exposing `table(name)` like the Supabase client.
+    One connection per thread (sqlite3 connections are not shareable across threads).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._memory = path == ":memory:"
+        if self._memory:
+            # Shared-cache in-memory DB so every thread sees the same data.
+            # Keep one connection open for the lifetime of the client to keep it alive.
+            self._uri = f"file:sqlite_client_{id(self)}?mode=memory&cache=shared"
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._uri = None
+        self._keepalive = self.connection()
+        self._ensure_schema(self._keepalive)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._uri:
+                conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        with conn:
+            for table, schema in TABLE_SCHEMAS.items():
+                col_defs = ", ".join(
+                    f'"{c}" {"TEXT" if t == "JSON" else t}' for c, t in schema["columns"].items()
+                )
+                pk = ", ".join(f'"{c}"' for c in schema["primary_key"])
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({col_defs}, PRIMARY KEY ({pk}))')
+
+                # Add columns introduced after the DB file was created
+                existing = {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+                for c, t in schema["columns"].items():
+                    if c not in existing:
+                        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{c}" {"TEXT" if t == "JSON" else t}')
+
+                for cols in schema["indexes"]:
+                    name = f"idx_{table}_{'_'.join(cols)}"
+                    col_sql = ", ".join(f'"{c}"' for c in cols)
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({col_sql})')
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, name)
+
+
+def create_sqlite_client(path: str) -> SQLiteClient:
+    return SQLiteClient(path)
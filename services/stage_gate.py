@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from services.content_hash import content_hash
+
+# Idempotent batch stages: one `batch_stage_log` row per (date, stage) with the
+# fingerprint of the stage inputs and its persisted output. A rerun for the same
+# date reuses the output when the fingerprint matches, unless the stage is forced.
+TABLE = "batch_stage_log"
+
+MACRO = "macro"          # Global data + headlines + macro LLM call -> sector scores / risk events
+ANALYSIS = "analysis"    # Technical pass + deep dives over the universe
+SAVE = "save"            # Upserts, sector aggregates, snapshots, update signal
+STAGES = [MACRO, ANALYSIS, SAVE]
+
+# Bump when a stage's logic or prompt changes so stored outputs are recomputed
+STAGE_VERSIONS = {MACRO: 1, ANALYSIS: 1, SAVE: 1}
+
+
+def fingerprint(stage: str, inputs: Dict[str, Any]) -> str:
+    return content_hash({"stage": stage, "version": STAGE_VERSIONS[stage], "inputs": inputs})
+
+
+def load(supabase, target_date: str, stage: str) -> Optional[Dict[str, Any]]:
+    res = (
+        supabase.table(TABLE)
+        .select("date, stage, status, fingerprint, output, completed_at")
+        .eq("date", target_date)
+        .eq("stage", stage)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0] if res.data else None
+
+
+def reusable(supabase, target_date: str, stage: str, stage_fingerprint: str, force=()) -> Optional[Dict[str, Any]]:
+    """
+    Stored output of a completed stage with the same input fingerprint, else None
+    (missing, incomplete, different inputs, forced, or the marker could not be read).
+    """
+    if stage in force:
+        print(f"    ⏩ Stage '{stage}' forced; recomputing.")
+        return None
+    try:
+        marker = load(supabase, target_date, stage)
+    except Exception as e:
+        print(f"!!! Could not read stage marker '{stage}' ({e}); recomputing.")
+        return None
+    if not marker or marker.get("status") != "complete":
+        return None
+    if marker.get("fingerprint") != stage_fingerprint:
+        print(f"    Stage '{stage}' inputs changed since {marker.get('completed_at')}; recomputing.")
+        return None
+    print(f"    ♻️ Stage '{stage}' already complete for {target_date} ({marker.get('completed_at')}); reusing output.")
+    return marker.get("output") or {}
+
+
+def complete(supabase, target_date: str, stage: str, stage_fingerprint: str, output: Dict[str, Any] = None) -> bool:
+    """Record a finished stage. A failed write only costs a recompute on the next rerun."""
+    try:
+        supabase.table(TABLE).upsert({
+            "date": target_date,
+            "stage": stage,
+            "status": "complete",
+            "fingerprint": stage_fingerprint,
+            "output": output or {},
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+        }).execute()
+        return True
+    except Exception as e:
+        print(f"!!! Could not record stage '{stage}' ({e}).")
+        return False
+
+
+def parse_force(value: Optional[str]):
+    """--force value -> set of stages ('all' or a comma list)."""
+    if not value:
+        return set()
+    if value == "all":
+        return set(STAGES)
+    stages = {s.strip() for s in value.split(",") if s.strip()}
+    unknown = stages - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))} (expected {', '.join(STAGES)} or all)")
+    return stages
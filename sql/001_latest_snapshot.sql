@@ -0,0 +1,8 @@
+-- Materialized "latest" views published by the daily batch.
+-- API "latest" endpoints answer from a single primary-key read of this table.
+create table if not exists latest_snapshot (
+    name text primary key,          -- analysis_date | analysis_all | analysis_recommend | macro
+    date date not null,
+    payload jsonb,
+    updated_at timestamptz default now()
+);
@@ -0,0 +1,3 @@
+-- Per-ticker history (/api/history, /api/history/{ticker}) and per-date signal filters
+create index if not exists idx_market_analysis_log_ticker_date on market_analysis_log (ticker, date);
+create index if not exists idx_market_analysis_log_date_signal on market_analysis_log (date, signal);
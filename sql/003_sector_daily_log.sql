@@ -0,0 +1,15 @@
+-- Per-date sector aggregates computed by the batch (served by /api/sectors)
+create table if not exists sector_daily_log (
+    date date not null,
+    sector text not null,
+    stock_count integer,
+    buy_count integer,
+    aggressive_count integer,
+    wait_count integer,
+    avg_rsi double precision,
+    above_sma75_ratio double precision,
+    avg_correlation_us double precision,
+    avg_upside_ratio double precision,
+    macro_score integer,
+    primary key (date, sector)
+);
@@ -0,0 +1,2 @@
+-- Content hash per (date, ticker) row: the batch skips upserts of unchanged rows on reruns
+alter table market_analysis_log add column if not exists content_hash text;
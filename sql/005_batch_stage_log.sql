@@ -0,0 +1,11 @@
+-- Completion markers of the daily batch stages: reruns for a date reuse the stored
+-- output of a stage whose input fingerprint is unchanged (see services/stage_gate.py)
+create table if not exists batch_stage_log (
+    date date not null,
+    stage text not null,
+    status text not null,
+    fingerprint text,
+    output jsonb,
+    completed_at timestamptz,
+    primary key (date, stage)
+);
@@ -0,0 +1,11 @@
+-- LLM usage per batch process (services/llm_telemetry.py): daily totals for the quota projection
+create table if not exists llm_usage_log (
+    date date not null,
+    run_id text not null,
+    requests integer,
+    prompt_tokens integer,
+    output_tokens integer,
+    rate_limited integer,
+    summary jsonb,
+    primary key (date, run_id)
+);